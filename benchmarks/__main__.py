@@ -0,0 +1,92 @@
+"""
+Measures the speed and memory use of the cerealizers.
+
+    python -m benchmarks                          # print results
+    python -m benchmarks --save baseline.json     # record a baseline
+    python -m benchmarks --compare baseline.json  # exit with 1 on regressions past --threshold
+"""
+import argparse
+import fnmatch
+import json
+import sys
+import timeit
+import tracemalloc
+import typing
+
+from benchmarks.cases import all_cases, Case
+
+Result = typing.Dict[str, float]
+
+
+def measure(case: Case, min_time: float, repeat: int) -> Result:
+    timer = timeit.Timer(case.run)
+    number, _ = timer.autorange()
+    number = max(1, int(number * min_time / 0.2))
+    best = min(timer.repeat(repeat, number)) / number
+
+    tracemalloc.start()
+    try:
+        case.run()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {'ops_per_sec': 1 / best, 'bytes_per_op': case.size, 'peak_memory': peak}
+
+
+def regressions(results: typing.Dict[str, Result], baseline: typing.Dict[str, Result],
+                threshold: float) -> typing.List[str]:
+    """
+    Describes every case that is more than `threshold` (a fraction) slower, or uses that much more peak memory, than
+    in `baseline`.
+    """
+    found = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['ops_per_sec'] < before['ops_per_sec'] * (1 - threshold):
+            found.append(f'{name}: {before["ops_per_sec"]:,.0f} -> {result["ops_per_sec"]:,.0f} ops/sec')
+        if result['peak_memory'] > before['peak_memory'] * (1 + threshold):
+            found.append(f'{name}: {before["peak_memory"]:,.0f} -> {result["peak_memory"]:,.0f} bytes peak memory')
+    return found
+
+
+def main(argv: typing.List[str] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmarks', description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('-k', '--filter', default='*', help='only run cases whose name matches this glob')
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds each timing run should take')
+    parser.add_argument('--repeat', type=int, default=5, help='timing runs per case, of which the best is kept')
+    parser.add_argument('--save', metavar='PATH', help='write the results to this JSON file')
+    parser.add_argument('--compare', metavar='PATH', help='compare the results to a baseline JSON file')
+    parser.add_argument('--threshold', type=float, default=0.1,
+                        help='the fraction by which a case may regress before failing (default: 0.1)')
+    args = parser.parse_args(argv)
+
+    results = {}
+    print(f'{"case":<40} {"ops/sec":>12} {"bytes/op":>10} {"peak memory":>12}')
+    for case in all_cases():
+        if not fnmatch.fnmatch(case.name, args.filter):
+            continue
+        result = results[case.name] = measure(case, args.min_time, args.repeat)
+        print(f'{case.name:<40} {result["ops_per_sec"]:>12,.0f} {result["bytes_per_op"]:>10,} '
+              f'{result["peak_memory"]:>12,}')
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.compare:
+        with open(args.compare) as f:
+            found = regressions(results, json.load(f), args.threshold)
+        for regression in found:
+            print(f'REGRESSION {regression}', file=sys.stderr)
+        if found:
+            return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
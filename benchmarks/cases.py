@@ -0,0 +1,180 @@
+import dataclasses
+import io
+import random
+import typing
+from enum import Enum
+from typing import List, Optional, Union, Dict
+
+from super_cereal.cerealizer.encryption import Encrypted, EncryptedCerealizer
+from super_cereal.cerealizer.json import JsonByteCerealizer
+
+
+class Color(Enum):
+    RED = 1
+    GREEN = 2
+    BLUE = 3
+
+
+@dataclasses.dataclass
+class Small:
+    id: int
+    name: str
+    score: float
+    active: bool
+
+
+@dataclasses.dataclass
+class Large:
+    field0: str
+    field1: int
+    field2: float
+    field3: Optional[str]
+    field4: Color
+    field5: List[Small]
+    field6: Dict[str, int]
+    field7: Small
+    field8: Optional[Small]
+    field9: List[str]
+    field10: str
+    field11: int
+    field12: float
+    field13: Optional[int]
+    field14: Color
+    field15: List[int]
+
+
+@dataclasses.dataclass
+class Depth0:
+    value: int
+
+
+@dataclasses.dataclass
+class Depth1:
+    value: int
+    children: List[Depth0]
+
+
+@dataclasses.dataclass
+class Depth2:
+    value: int
+    children: List[Depth1]
+
+
+@dataclasses.dataclass
+class Depth3:
+    value: int
+    children: List[Depth2]
+
+
+@dataclasses.dataclass
+class Depth4:
+    value: int
+    children: List[Depth3]
+
+
+@dataclasses.dataclass
+class Floats:
+    values: List[float]
+
+
+@dataclasses.dataclass
+class Unions:
+    field1: Optional[str]
+    field2: Union[int, str]
+    field3: Optional[Small]
+    field4: Optional[Color]
+    field5: Union[float, str, None]
+    field6: Optional[List[Optional[Small]]]
+
+
+@dataclasses.dataclass
+class Secrets:
+    id: int
+    password: Encrypted[str]
+    profile: Encrypted[Small]
+
+
+KEYS = {'the_key': bytes(range(16))}
+
+
+def small(i: int = 0) -> Small:
+    return Small(i, f'name {i}', i / 3, i % 2 == 0)
+
+
+def large() -> Large:
+    return Large('stuff', 42, 1.5, None, Color.RED, [small(i) for i in range(20)], {'a': 1, 'b': 2}, small(), small(1),
+                 [f'tag {i}' for i in range(20)], 'more stuff', 7, 2.5, 3, Color.BLUE, list(range(50)))
+
+
+def deep() -> Depth4:
+    # 3 children per level, 121 objects in all.
+    return Depth4(4, [Depth3(3, [Depth2(2, [Depth1(1, [Depth0(0)] * 3)] * 3)] * 3)] * 3)
+
+
+def floats(count: int = 10_000) -> Floats:
+    generator = random.Random(0)
+    return Floats([generator.random() for _ in range(count)])
+
+
+def unions() -> Unions:
+    return Unions('stuff', 42, small(), Color.GREEN, 1.5, [small(i) if i % 2 else None for i in range(10)])
+
+
+def secrets() -> Secrets:
+    return Secrets(1, Encrypted('the_key', 'hunter2'), Encrypted('the_key', small()))
+
+
+class Case(typing.NamedTuple):
+    name: str
+    #: Runs one operation.
+    run: typing.Callable[[], any]
+    #: The size of the serialized form handled by one operation.
+    size: int
+
+
+def json_cases(name: str, obj: any, t: type, **kwargs: any) -> typing.List[Case]:
+    cerealizer = JsonByteCerealizer(KEYS, **kwargs)
+    serialized = cerealizer.serialize(obj, t)
+    return [
+        Case(f'{name}/serialize', lambda: cerealizer.serialize(obj, t), len(serialized)),
+        Case(f'{name}/deserialize', lambda: cerealizer.deserialize(serialized, t), len(serialized)),
+    ]
+
+
+def avro_cases(name: str, objs: typing.List[any], t: type) -> typing.List[Case]:
+    try:
+        from super_cereal.cerealizer.avro import AvroCerealizer
+    except ImportError:
+        return []
+
+    single = AvroCerealizer(single_object=True)
+    batch = AvroCerealizer()
+    serialized_single = [single.serialize(obj, t) for obj in objs]
+    single_size = sum(map(len, serialized_single))
+    serialized_batch = batch.serialize_many(objs, t)
+
+    return [
+        Case(f'{name}/single/serialize', lambda: [single.serialize(obj, t) for obj in objs], single_size),
+        Case(f'{name}/single/deserialize', lambda: [single.deserialize(obj, t) for obj in serialized_single],
+             single_size),
+        Case(f'{name}/batch/serialize', lambda: batch.serialize_many(objs, t), len(serialized_batch)),
+        Case(f'{name}/batch/deserialize', lambda: list(batch.deserialize_stream(io.BytesIO(serialized_batch), t)),
+             len(serialized_batch)),
+    ]
+
+
+def all_cases() -> typing.List[Case]:
+    cases = [
+        *json_cases('json/small', small(), Small),
+        *json_cases('json/large', large(), Large),
+        *json_cases('json/large-compiled', large(), Large, compiled=True),
+        *json_cases('json/deep', deep(), Depth4),
+        *json_cases('json/floats', floats(), Floats),
+        *json_cases('json/unions', unions(), Unions),
+    ]
+
+    if EncryptedCerealizer.enabled():
+        cases += json_cases('json/encrypted', secrets(), Secrets)
+
+    cases += avro_cases('avro/small-x100', [small(i) for i in range(100)], Small)
+    return cases
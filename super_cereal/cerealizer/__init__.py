@@ -1,7 +1,8 @@
 import abc
 import typing
+import weakref
 from abc import ABC
-from typing import TypeVar, Generic, Dict, Optional
+from typing import TypeVar, Generic, Dict, Optional, NamedTuple, Tuple
 
 T = TypeVar('T')
 V = TypeVar('V')
@@ -15,6 +16,17 @@ class DeserializationException(Exception):
     pass
 
 
+class CacheInfo(NamedTuple):
+    hits: int
+    misses: int
+    size: int
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
 class ICerealizer(Generic[T, V], abc.ABC):  # pragma: no cover
 
     @abc.abstractmethod
@@ -34,6 +46,9 @@ class ITypeRegistry(Dict[type, ICerealizer], abc.ABC):
 
 
 class Cerealizer(ICerealizer[T, V], ABC):
+    #: The types a serialized value can have, if known. Lets `UnionCerealizer` pick an arm when deserializing.
+    serialized_types: Tuple[type, ...] = ()
+
     def __init__(self, encryption_keys: Dict[str, bytes] = None):
         if encryption_keys is None:
             encryption_keys = {}
@@ -41,13 +56,28 @@ class Cerealizer(ICerealizer[T, V], ABC):
 
     def add_registry(self, registry: Optional[ITypeRegistry]):
         self.registry = registry
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Drop anything cached from previous registry lookups. Called whenever the registry changes.
+        """
+        pass
 
 
 class TheTypeRegistry(ITypeRegistry):
-    def __init__(self) -> None:
+    def __init__(self, max_resolved: int = 4096) -> None:
+        """
+        :param max_resolved: how many resolved lookups to remember before starting over.
+        """
         super().__init__()
         self.d: Dict[type, Cerealizer] = {}
         self._default = None
+        self._resolved: Dict[int, Tuple[Cerealizer, weakref.ref]] = {}
+        self.max_resolved = max_resolved
+        self.hits = 0
+        self.misses = 0
+        self._instrumentation = None
 
     @property
     def default(self):
@@ -61,11 +91,47 @@ class TheTypeRegistry(ITypeRegistry):
         self._default = value
 
         value.add_registry(self)
+        self._invalidate()
+
+    @property
+    def instrumentation(self):
+        """
+        An `Instrumentation` that times the cerealizers this registry resolves, or None.
+        """
+        return self._instrumentation
+
+    @instrumentation.setter
+    def instrumentation(self, value):
+        self._instrumentation = value
+        self._invalidate()
 
     def __contains__(self, item):
         return item in self.d
 
     def __getitem__(self, item):
+        resolved = self._resolved.get(id(item))
+        if resolved is not None:
+            self.hits += 1
+            return resolved[0]
+
+        self.misses += 1
+        cerealizer = self._resolve(item)
+        if self._instrumentation is not None:
+            cerealizer = self._instrumentation.wrap(cerealizer)
+
+        # Keyed by id and dropped when the type is collected, so classes defined at runtime don't leak.
+        resolved = self._resolved
+        try:
+            ref = weakref.ref(item, lambda _, key=id(item): resolved.pop(key, None))
+        except TypeError:
+            return cerealizer
+
+        if len(resolved) >= self.max_resolved:
+            resolved.clear()
+        resolved[id(item)] = (cerealizer, ref)
+        return cerealizer
+
+    def _resolve(self, item):
         if item in self.d:
             return self.d[item]
         if typing.get_origin(item) in self.d:
@@ -78,10 +144,22 @@ class TheTypeRegistry(ITypeRegistry):
     def __setitem__(self, key: type, value: Cerealizer):
         self.d[key] = value
         value.add_registry(self)
+        self._invalidate()
 
     def __delitem__(self, key):
         popped = self.d.pop(key)
         popped.add_registry(None)
+        self._invalidate()
 
     def __len__(self):
         return len(self.d) + 1
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, len(self._resolved))
+
+    def _invalidate(self):
+        self._resolved.clear()
+        for cerealizer in self.d.values():
+            cerealizer.invalidate()
+        if self._default is not None:
+            self._default.invalidate()
@@ -0,0 +1,121 @@
+import asyncio
+import concurrent.futures
+import functools
+import typing
+import weakref
+
+from super_cereal.cerealizer import ICerealizer, T, DeserializationException
+from super_cereal.cerealizer.json import JsonByteCerealizer
+
+#: The length prefix of each record in a stream of a cerealizer other than `JsonByteCerealizer`.
+LENGTH_PREFIX_SIZE = 4
+
+
+class AsyncCerealizer:
+    """
+    Async counterparts of a cerealizer's methods for use on an event loop. Objects whose serialized form is at least
+    `threshold` bytes are handled on `executor`, so they don't hold up other coroutines; smaller ones are handled
+    inline, where a round trip to the executor would cost more than it saves.
+
+    When deserializing, the size is that of the input. When serializing it isn't known up front, so the size of the
+    previous output for the same type is used instead. Set `threshold` to 0 to always use the executor, for instance
+    when most messages carry `Encrypted` fields.
+
+    Streams are newline-delimited JSON for a `JsonByteCerealizer`, matching its `dump_stream` and `load_stream`, and
+    records with a 4 byte big-endian length prefix otherwise. Either way the cerealizer must produce bytes.
+    """
+
+    def __init__(self, cerealizer: ICerealizer, executor: concurrent.futures.Executor = None,
+                 threshold: int = 64 * 1024) -> None:
+        """
+        :param executor: where large objects are handled. Defaults to the event loop's default executor. A thread
+            pool keeps the event loop responsive; use a process pool only with a cerealizer that can be pickled.
+        :param threshold: the size in bytes from which objects are handled on `executor`.
+        """
+        self.cerealizer = cerealizer
+        self.executor = executor
+        self.threshold = threshold
+        self.sizes: typing.MutableMapping[type, int] = weakref.WeakKeyDictionary()
+        self.ndjson = isinstance(cerealizer, JsonByteCerealizer)
+
+    async def aserialize(self, obj: any, expected_type: T = None) -> any:
+        t = type(obj) if expected_type is None else expected_type
+        try:
+            size = self.sizes.get(t, 0)
+        except TypeError:
+            size = 0
+
+        serialized = await self._run(size, self.cerealizer.serialize, obj, expected_type)
+
+        if isinstance(serialized, (bytes, str)):
+            try:
+                self.sizes[t] = len(serialized)
+            except TypeError:
+                pass
+
+        return serialized
+
+    async def adeserialize(self, obj: any, t: T) -> T:
+        size = len(obj) if isinstance(obj, (bytes, str)) else 0
+        return await self._run(size, self.cerealizer.deserialize, obj, t)
+
+    async def _run(self, size: int, method: typing.Callable[..., any], *args: any) -> any:
+        if size < self.threshold:
+            return method(*args)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, functools.partial(method, *args))
+
+    async def write_stream(self, writer: asyncio.StreamWriter,
+                           objs: typing.Union[typing.Iterable[any], typing.AsyncIterable[any]],
+                           expected_type: T = None) -> int:
+        """
+        Writes `objs` to `writer`, waiting for it to drain after each record. Returns the number of records written.
+        `writer` is not closed.
+        """
+        count = 0
+
+        async def write(obj: any) -> None:
+            serialized = await self.aserialize(obj, expected_type)
+            if self.ndjson:
+                writer.writelines((serialized, b'\n'))
+            else:
+                writer.writelines((len(serialized).to_bytes(LENGTH_PREFIX_SIZE, 'big'), serialized))
+            await writer.drain()
+
+        if isinstance(objs, typing.AsyncIterable):
+            async for obj in objs:
+                await write(obj)
+                count += 1
+        else:
+            for obj in objs:
+                await write(obj)
+                count += 1
+
+        return count
+
+    async def read_stream(self, reader: asyncio.StreamReader, t: T) -> typing.AsyncIterator[T]:
+        """
+        Yields one object per record read from `reader` until it reaches EOF. Newline-delimited JSON lines can't be
+        longer than the limit `reader` was created with, and blank lines are skipped.
+        """
+        if self.ndjson:
+            async for line in reader:
+                if not line.isspace():
+                    yield await self.adeserialize(line, t)
+            return
+
+        while True:
+            try:
+                prefix = await reader.readexactly(LENGTH_PREFIX_SIZE)
+            except asyncio.IncompleteReadError as e:
+                if e.partial:
+                    raise DeserializationException('Stream ended inside a length prefix.') from e
+                return
+
+            try:
+                record = await reader.readexactly(int.from_bytes(prefix, 'big'))
+            except asyncio.IncompleteReadError as e:
+                raise DeserializationException('Stream ended inside a record.') from e
+
+            yield await self.adeserialize(record, t)
@@ -1,15 +1,32 @@
+import array
+import bisect
+import collections
+import functools
 import inspect
 import io
+import itertools
 import json
+import mmap
+import os
+import time
+import weakref
+import zlib
 from enum import EnumMeta
-from typing import Union, get_origin, get_args, Dict, List, Tuple
+from typing import Union, get_origin, get_args, Dict, List, Tuple, NamedTuple, MutableMapping, IO, Iterable, Optional, \
+    Callable, Type, Iterator, Sequence
 
-from avro.datafile import DataFileReader
-from avro.io import DatumReader
+import avro.codecs
+import avro.schema
+from avro.datafile import DataFileWriter, SYNC_INTERVAL, SYNC_SIZE, NULL_CODEC, META_SCHEMA, MAGIC, CODEC_KEY, \
+    SCHEMA_KEY
+from avro.io import DatumReader, DatumWriter, BinaryEncoder, BinaryDecoder
 
-from super_cereal.cerealizer import Cerealizer, V, T
+from super_cereal.cerealizer import Cerealizer, V, T, CacheInfo, SerializationException, DeserializationException
+from super_cereal.cerealizer.builtins import FieldPlan
 from super_cereal.cerealizer.encryption import Encrypted
+from super_cereal.cerealizer.instrumentation import Instrumentation, Event, SERIALIZE, DESERIALIZE
 from super_cereal.cerealizer.json import JsonCerealizer
+from super_cereal.cerealizer.projection import Projection, parse_fields, partial
 
 BUILTIN_ALIASES = {
     str: 'string',
@@ -21,10 +38,370 @@ BUILTIN_ALIASES = {
 }
 
 
+SINGLE_OBJECT_MAGIC = b'\xc3\x01'
+DEFLATE_CODEC = 'deflate'
+
+CRC_64_AVRO_EMPTY = 0xc15d213aa4d7a795
+
+
+def _crc_64_avro_table() -> List[int]:
+    table = []
+    for i in range(256):
+        fp = i
+        for _ in range(8):
+            fp = (fp >> 1) ^ (CRC_64_AVRO_EMPTY & -(fp & 1))
+        table.append(fp)
+    return table
+
+
+_CRC_64_AVRO_TABLE = _crc_64_avro_table()
+
+
+def schema_fingerprint(schema: avro.schema.Schema) -> bytes:
+    """
+    The CRC-64-AVRO fingerprint of `schema`'s canonical form, little-endian as in the single-object encoding. Computed
+    here since avro 1.11.1 has no `Schema.fingerprint`.
+    """
+    fp = CRC_64_AVRO_EMPTY
+    for b in schema.canonical_form.encode():
+        fp = (fp >> 8) ^ _CRC_64_AVRO_TABLE[(fp ^ b) & 0xff]
+    return fp.to_bytes(8, 'little')
+
+
+class AvroSchema(NamedTuple):
+    json: Dict[str, any]
+    parsed: avro.schema.Schema
+    fingerprint: bytes
+
+
+class AvroSchemaCache:
+    """
+    Schemas generated by `AvroCerealizer.get_schema`, both as JSON and parsed, weakly keyed by type. Every schema is
+    also indexed by its CRC-64-AVRO fingerprint for reading single-object encoded messages.
+
+    Writer schemas read from object container headers are kept too, keyed by their JSON as written, so they are only
+    parsed and fingerprinted once.
+    """
+
+    def __init__(self) -> None:
+        self.schemas: MutableMapping[type, AvroSchema] = weakref.WeakKeyDictionary()
+        self.fingerprints: Dict[bytes, AvroSchema] = {}
+        self.written: Dict[bytes, Tuple[avro.schema.Schema, bytes]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __getitem__(self, t: type) -> AvroSchema:
+        try:
+            schema = self.schemas[t]
+            self.hits += 1
+            return schema
+        except KeyError:
+            pass
+
+        self.misses += 1
+        the_json = AvroCerealizer.get_schema(t)
+        parsed = avro.schema.parse(json.dumps(the_json))
+        schema = self.schemas[t] = AvroSchema(the_json, parsed, schema_fingerprint(parsed))
+        self.fingerprints.setdefault(schema.fingerprint, schema)
+        return schema
+
+    def __contains__(self, t: type) -> bool:
+        return t in self.schemas
+
+    def __len__(self) -> int:
+        return len(self.schemas)
+
+    def warm(self, *types: type) -> None:
+        """
+        Generates and parses the schemas for `types` ahead of the first message.
+        """
+        for t in types:
+            if t not in self.schemas:
+                self[t]
+
+    def parse_written(self, raw: bytes) -> Tuple[avro.schema.Schema, bytes]:
+        """
+        Returns the parsed writer schema in `raw`, the JSON from a container header, and its fingerprint.
+        """
+        try:
+            return self.written[raw]
+        except KeyError:
+            pass
+
+        parsed = avro.schema.parse(raw.decode())
+        written = self.written[raw] = (parsed, schema_fingerprint(parsed))
+        return written
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, len(self.schemas))
+
+    def clear(self) -> None:
+        self.schemas.clear()
+        self.fingerprints.clear()
+        self.written.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+Writer = Callable[[any, BinaryEncoder], None]
+Reader = Callable[[BinaryDecoder], any]
+
+INT_RANGE = range(-(1 << 31), 1 << 31)
+
+
+class _ObjectDatumWriter(DatumWriter):
+    """
+    Writes objects straight to the encoder with a writer built by `AvroCerealizer`.
+    """
+
+    def __init__(self, write: Writer) -> None:
+        super().__init__()
+        self._write = write
+
+    def write(self, datum: object, encoder: BinaryEncoder) -> None:
+        self._write(datum, encoder)
+
+
+class _DataFileWriter(DataFileWriter):
+    __slots__ = ('sync_interval', 'block_size')
+
+    def __init__(self, writer: IO[bytes], datum_writer: DatumWriter, writers_schema: avro.schema.Schema, codec: str,
+                 sync_interval: int, block_size: Optional[int]) -> None:
+        super().__init__(writer, datum_writer, writers_schema, codec)
+        self.sync_interval = sync_interval
+        self.block_size = block_size
+
+    def append(self, datum: object) -> None:
+        self.datum_writer.write(datum, self.buffer_encoder)
+        self.block_count += 1
+
+        if self.buffer_writer.tell() >= self.sync_interval or self.block_count == self.block_size:
+            self._write_block()
+
+
+class AvroWriter:
+    """
+    Appends any number of objects of one type to a single Avro object container, so the header and schema are only
+    written once. Obtained from `AvroCerealizer.writer`; the underlying file object is flushed, not closed, on exit.
+    """
+
+    def __init__(self, cerealizer: 'AvroCerealizer', fileobj: IO[bytes], t: type, codec: str, sync_interval: int,
+                 block_size: Optional[int]) -> None:
+        avro.codecs.get_codec(codec)
+
+        self.cerealizer = cerealizer
+        self.t = t
+        self.count = 0
+        self._writer = _DataFileWriter(fileobj, _ObjectDatumWriter(cerealizer.datum_writer(t)),
+                                       cerealizer.schemas[t].parsed, codec, sync_interval, block_size)
+
+    def append(self, obj: any) -> None:
+        self._writer.append(obj)
+        self.count += 1
+
+    def extend(self, objs: Iterable[any]) -> None:
+        for obj in objs:
+            self.append(obj)
+
+    def flush(self) -> None:
+        self._writer.flush()
+
+    def __enter__(self) -> 'AvroWriter':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if exc_type is None:
+            self.flush()
+
+
+class AvroBlock(NamedTuple):
+    #: Where the block's data starts in the file.
+    offset: int
+    size: int
+    count: int
+
+
+class AvroFile(Sequence):
+    """
+    Random access to the objects in an Avro object container file, such as those written by `AvroWriter`. The file is
+    memory-mapped and indexed by block, so `len()`, indexing and slicing only decode the blocks they need, straight
+    from the mapping. Obtained from `AvroCerealizer.open`.
+
+    The index is built by hopping from sync marker to sync marker, which reads a few bytes per block rather than the
+    file. With an `index_path` it is saved there and reused as long as the file's size and sync marker still match.
+    """
+
+    def __init__(self, cerealizer: 'AvroCerealizer', path: Union[str, os.PathLike], t: type,
+                 index_path: Union[str, os.PathLike] = None, cached_blocks: int = 8,
+                 fields: Iterable[str] = None) -> None:
+        with open(path, 'rb') as f:
+            size = os.fstat(f.fileno()).st_size
+            # An empty file can't be mapped, and holds no container either.
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+
+        self._view = memoryview(self._mmap)
+        self._cache: 'collections.OrderedDict[int, List[T]]' = collections.OrderedDict()
+        self.cached_blocks = cached_blocks
+        self.t = t
+
+        try:
+            self._open(cerealizer, index_path, fields)
+        except BaseException:
+            self.close()
+            raise
+
+    def _open(self, cerealizer: 'AvroCerealizer', index_path: Optional[Union[str, os.PathLike]],
+              fields: Optional[Iterable[str]]) -> None:
+        decoder = BinaryDecoder(_ViewReader(self._view))
+        try:
+            header = DatumReader().read_data(META_SCHEMA, META_SCHEMA, decoder)
+        except Exception as e:
+            raise DeserializationException('Not an Avro object container.') from e
+        if header['magic'] != MAGIC:
+            raise DeserializationException('Not an Avro object container.')
+
+        meta = header['meta']
+        self.codec = meta.get(CODEC_KEY, NULL_CODEC.encode()).decode()
+        self.sync = header['sync']
+        writers_schema, fingerprint = cerealizer.schemas.parse_written(meta[SCHEMA_KEY])
+        self._read = cerealizer.datum_reader(writers_schema, self.t, fingerprint, fields)
+
+        self.blocks = self._load_index(index_path) if index_path is not None else None
+        if self.blocks is None:
+            self.blocks = self._build_index(decoder.reader.pos)
+            if index_path is not None:
+                self._save_index(index_path)
+
+        self._starts = list(itertools.accumulate((block.count for block in self.blocks), initial=0))
+
+    def _build_index(self, position: int) -> List[AvroBlock]:
+        blocks = []
+        view = self._view
+        while position < len(view):
+            try:
+                count, position = _varint(view, position)
+                size, position = _varint(view, position)
+            except IndexError:
+                raise DeserializationException('Avro block is truncated.') from None
+            blocks.append(AvroBlock(position, size, count))
+            position += size
+            if position + SYNC_SIZE > len(view):
+                raise DeserializationException('Avro block is truncated.')
+            if view[position:position + SYNC_SIZE] != self.sync:
+                raise DeserializationException('Avro sync marker does not match.')
+            position += SYNC_SIZE
+        return blocks
+
+    def _load_index(self, index_path: Union[str, os.PathLike]) -> Optional[List[AvroBlock]]:
+        try:
+            with open(index_path) as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if index.get('size') != len(self._view) or index.get('sync') != self.sync.hex():
+            return None
+        return [AvroBlock(*block) for block in index['blocks']]
+
+    def _save_index(self, index_path: Union[str, os.PathLike]) -> None:
+        with open(index_path, 'w') as f:
+            json.dump({'size': len(self._view), 'sync': self.sync.hex(), 'blocks': self.blocks}, f)
+
+    def block(self, i: int) -> List[T]:
+        """
+        Returns the decoded objects of block `i`, keeping the most recently used `cached_blocks` blocks.
+        """
+        try:
+            self._cache.move_to_end(i)
+            return self._cache[i]
+        except KeyError:
+            pass
+
+        block = self.blocks[i]
+        data = self._view[block.offset:block.offset + block.size]
+        if self.codec == NULL_CODEC:
+            decoder = BinaryDecoder(_ViewReader(data))
+        else:
+            decoder = _block_decoder(self.codec, data if self.codec == DEFLATE_CODEC else bytes(data))
+
+        read = self._read
+        objs = self._cache[i] = [read(decoder) for _ in range(block.count)]
+        if len(self._cache) > self.cached_blocks:
+            self._cache.popitem(last=False)
+        return objs
+
+    def __len__(self) -> int:
+        return self._starts[-1]
+
+    def __getitem__(self, item: Union[int, slice]) -> Union[T, List[T]]:
+        if isinstance(item, slice):
+            return [self[i] for i in range(*item.indices(len(self)))]
+
+        if item < 0:
+            item += len(self)
+        if not 0 <= item < len(self):
+            raise IndexError('AvroFile index out of range')
+
+        i = bisect.bisect_right(self._starts, item) - 1
+        return self.block(i)[item - self._starts[i]]
+
+    def __iter__(self) -> Iterator[T]:
+        for i in range(len(self.blocks)):
+            yield from self.block(i)
+
+    def close(self) -> None:
+        self._cache.clear()
+        self._view.release()
+        if isinstance(self._mmap, mmap.mmap):
+            self._mmap.close()
+
+    def __enter__(self) -> 'AvroFile':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+class _ViewReader:
+    """
+    A minimal file object over a memoryview for `BinaryDecoder`, copying only the bytes each read asks for.
+    """
+    __slots__ = ('view', 'pos')
+
+    def __init__(self, view: memoryview) -> None:
+        self.view = view
+        self.pos = 0
+
+    def read(self, n: int) -> bytes:
+        data = bytes(self.view[self.pos:self.pos + n])
+        self.pos += len(data)
+        return data
+
+    def tell(self) -> int:
+        return self.pos
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self.pos
+        elif whence == os.SEEK_END:
+            offset += len(self.view)
+        self.pos = offset
+        return offset
+
+
 class AvroCerealizer(Cerealizer):
-    def __init__(self, encryption_keys: Dict[str, bytes] = None) -> None:
+    def __init__(self, encryption_keys: Dict[str, bytes] = None, single_object: bool = False) -> None:
+        """
+        :param single_object: write the Avro single-object encoding (a two byte marker, the schema's CRC-64-AVRO
+            fingerprint and the binary datum) instead of an object container. Readers need the writer's schema in
+            `schemas`, which happens on first use of a type or through `schemas.warm`.
+        """
         super().__init__(encryption_keys)
         self.json_serializer = JsonCerealizer(encryption_keys)
+        self.schemas = AvroSchemaCache()
+        self.single_object = single_object
+        self._writers: MutableMapping[type, Writer] = weakref.WeakKeyDictionary()
+        self._readers: MutableMapping[type, Dict[any, Reader]] = weakref.WeakKeyDictionary()
 
     @staticmethod
     def get_schema(record: type) -> Dict[str, any]:
@@ -88,25 +465,566 @@ class AvroCerealizer(Cerealizer):
 
         return get_schema(record, inspect.getmodule(record).__name__)
 
+    @property
+    def instrumentation(self) -> Optional[Instrumentation]:
+        """
+        An `Instrumentation` that times `serialize` and `deserialize` and counts their bytes per type, or None.
+        """
+        return self.json_serializer.registry.instrumentation
+
+    @instrumentation.setter
+    def instrumentation(self, value: Optional[Instrumentation]) -> None:
+        self.json_serializer.registry.instrumentation = value
+
     def serialize(self, obj: any, t: T = None) -> V:
-        import avro.schema
-        from avro.datafile import DataFileWriter
-        from avro.io import DatumWriter
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return self._serialize(obj)
 
-        the_json = self.get_schema(type(obj))
-        schema_json = json.dumps(the_json)
-        schema = avro.schema.parse(schema_json)
+        start = time.perf_counter()
+        serialized = self._serialize(obj)
+        instrumentation.record(Event(SERIALIZE, type(obj), 1, time.perf_counter() - start, len(serialized)))
+        return serialized
+
+    def _serialize(self, obj: any) -> bytes:
+        if self.single_object:
+            return self._serialize_single_object(obj)
+
+        t = type(obj)
+        schema = self.schemas[t].parsed
 
         with io.BytesIO() as bytes_io:
-            with DataFileWriter(bytes_io, DatumWriter(), schema) as writer:
-                writer.append(self.json_serializer.serialize(obj))
+            with DataFileWriter(bytes_io, _ObjectDatumWriter(self.datum_writer(t)), schema) as writer:
+                writer.append(obj)
                 writer.flush()
                 return bytes_io.getvalue()
 
-    def deserialize(self, obj: bytes, t: T) -> T:
+    def writer(self, fileobj: IO[bytes], t: type, codec: str = NULL_CODEC, sync_interval: int = SYNC_INTERVAL,
+               block_size: Optional[int] = None) -> AvroWriter:
+        """
+        Opens an `AvroWriter` appending objects of type `t` to `fileobj`.
+
+        :param codec: any codec supported by avro, e.g. `null` or `deflate`.
+        :param sync_interval: bytes buffered before a block is written.
+        :param block_size: maximum number of records per block, unlimited when None.
+        """
+        return AvroWriter(self, fileobj, t, codec, sync_interval, block_size)
+
+    def serialize_many(self, objs: Iterable[any], t: type, codec: str = NULL_CODEC,
+                       sync_interval: int = SYNC_INTERVAL, block_size: Optional[int] = None) -> bytes:
+        """
+        Serializes all of `objs` into one Avro object container. See `writer` for the parameters.
+        """
+        with io.BytesIO() as bytes_io:
+            with self.writer(bytes_io, t, codec, sync_interval, block_size) as writer:
+                writer.extend(objs)
+            return bytes_io.getvalue()
+
+    def open(self, path: Union[str, os.PathLike], t: type, index_path: Union[str, os.PathLike] = None,
+             cached_blocks: int = 8, fields: Iterable[str] = None) -> AvroFile:
+        """
+        Opens the Avro object container at `path` for random access to its objects of type `t`. See `AvroFile`.
+
+        :param index_path: where to keep the block index between runs. Held in memory only when None.
+        :param cached_blocks: how many decoded blocks to keep.
+        :param fields: only decode these fields, like `deserialize`.
+        """
+        return AvroFile(self, path, t, index_path, cached_blocks, fields)
+
+    def deserialize(self, obj: bytes, t: T, fields: Iterable[str] = None) -> T:
+        """
+        Returns the first object in `obj`, or None if it has none. Use `deserialize_stream` to read every object.
+
+        :param fields: only decode these fields, given as dotted paths like `address.city`, and skip over the rest.
+            Returns a partial object, like `JsonCerealizer.deserialize` does.
+        """
+        instrumentation = self.instrumentation
+        if instrumentation is None:
+            return self._deserialize(obj, t, fields)
+
+        start = time.perf_counter()
+        deserialized = self._deserialize(obj, t, fields)
+        instrumentation.record(Event(DESERIALIZE, t, 1, time.perf_counter() - start, len(obj)))
+        return deserialized
+
+    def _deserialize(self, obj: bytes, t: T, fields: Optional[Iterable[str]]) -> T:
+        if self.single_object:
+            return self._deserialize_single_object(obj, t, fields)
+
         with io.BytesIO(obj) as bytes_io:
-            with DataFileReader(bytes_io, DatumReader()) as reader:
-                for msg in reader:
-                    return self.json_serializer.deserialize(msg, t)
+            return next(self.deserialize_stream(bytes_io, t, fields), None)
+
+    def deserialize_stream(self, fileobj: IO[bytes], t: type, fields: Iterable[str] = None) -> Iterator[T]:
+        """
+        Lazily yields every object in the Avro object container read from `fileobj`, one block at a time, so memory
+        is bounded by the largest block rather than the file. `fileobj` does not need to be seekable and is not closed.
+
+        :param fields: only decode these fields, like `deserialize`.
+        """
+        decoder = BinaryDecoder(fileobj)
+        header = DatumReader().read_data(META_SCHEMA, META_SCHEMA, decoder)
+        if header['magic'] != MAGIC:
+            raise DeserializationException('Not an Avro object container.')
+
+        meta = header['meta']
+        codec = meta.get(CODEC_KEY, NULL_CODEC.encode()).decode()
+        writers_schema, fingerprint = self.schemas.parse_written(meta[SCHEMA_KEY])
+        read = self.datum_reader(writers_schema, t, fingerprint, fields)
+
+        while True:
+            count = _read_long(fileobj)
+            if count is None:
+                return
+
+            size = decoder.read_long()
+            data = fileobj.read(size)
+            if len(data) != size:
+                raise DeserializationException('Avro block is truncated.')
+
+            block_decoder = _block_decoder(codec, data)
+            del data
+            for _ in range(count):
+                yield read(block_decoder)
+
+            if fileobj.read(SYNC_SIZE) != header['sync']:
+                raise DeserializationException('Avro sync marker does not match.')
+
+    def _serialize_single_object(self, obj: any) -> bytes:
+        t = type(obj)
+        schema = self.schemas[t]
+
+        with io.BytesIO() as bytes_io:
+            bytes_io.write(SINGLE_OBJECT_MAGIC)
+            bytes_io.write(schema.fingerprint)
+            self.datum_writer(t)(obj, BinaryEncoder(bytes_io))
+            return bytes_io.getvalue()
+
+    def _deserialize_single_object(self, obj: bytes, t: T, fields: Optional[Iterable[str]]) -> T:
+        if obj[:2] != SINGLE_OBJECT_MAGIC:
+            raise DeserializationException('Not Avro single-object encoded.')
+
+        fingerprint = bytes(obj[2:10])
+        schema = self.schemas.fingerprints.get(fingerprint)
+        if schema is None:
+            self.schemas.warm(t)
+            schema = self.schemas.fingerprints.get(fingerprint)
+        if schema is None:
+            raise DeserializationException(f'Unknown schema fingerprint {fingerprint.hex()}.')
+
+        with io.BytesIO(obj) as bytes_io:
+            bytes_io.seek(10)
+            return self.datum_reader(schema.parsed, t, fingerprint, fields)(BinaryDecoder(bytes_io))
+
+    def datum_writer(self, t: type) -> Writer:
+        """
+        Returns a function writing objects of type `t` straight to a `BinaryEncoder` against `t`'s schema, without
+        building the JSON intermediate first.
+        """
+        try:
+            return self._writers[t]
+        except KeyError:
+            pass
+
+        write = self._writers[t] = self._build_writer(self.schemas[t].parsed, t)
+        return write
+
+    def datum_reader(self, writers_schema: avro.schema.Schema, t: type, fingerprint: bytes = None,
+                     fields: Iterable[str] = None) -> Reader:
+        """
+        Returns a function reading objects of type `t` straight from a `BinaryDecoder`, for data written with
+        `writers_schema`. The writer's schema is resolved against `t` by field name: fields `t` doesn't have are
+        skipped and fields the writer didn't have take their default. The resolution is done once per writer schema
+        and type.
+
+        :param fingerprint: the CRC-64-AVRO fingerprint of `writers_schema`, if already known.
+        :param fields: only decode these dotted field paths into partial objects, skipping over everything else.
+        """
+        if fingerprint is None:
+            schema = self.schemas[t]
+            fingerprint = schema.fingerprint if writers_schema is schema.parsed \
+                else schema_fingerprint(writers_schema)
+
+        try:
+            readers = self._readers[t]
+        except KeyError:
+            readers = self._readers[t] = {}
+
+        key = fingerprint if fields is None else (fingerprint, tuple(sorted(fields)))
+        try:
+            return readers[key]
+        except KeyError:
+            pass
+
+        projection = None if fields is None else parse_fields(key[1])
+        read = readers[key] = self._build_reader(writers_schema, t, projection)
+        return read
+
+    def _build_writer(self, schema: avro.schema.Schema, t: type) -> Writer:
+        if t in BUILTIN_ALIASES:
+            return _primitive_writer(t)
+
+        if t == list or get_origin(t) == list:
+            write_item = self._build_writer(schema.items, get_args(t)[0])
+
+            def write_array(obj: list, encoder: BinaryEncoder) -> None:
+                if obj:
+                    encoder.write_long(len(obj))
+                    for item in obj:
+                        write_item(item, encoder)
+                encoder.write_long(0)
+
+            return write_array
+
+        if type(t) == EnumMeta:
+            symbols = {symbol: i for i, symbol in enumerate(schema.symbols)}
+            return lambda obj, encoder: encoder.write_int(symbols[obj.name])
+
+        if Union == get_origin(t):
+            # Same selection as `UnionCerealizer`: the first arm whose type, or generic origin, is the value's type.
+            arms: Dict[type, Tuple[int, Writer]] = {}
+            for i, (arm, branch) in enumerate(zip(get_args(t), schema.schemas)):
+                write_arm = self._build_writer(branch, arm)
+                arms.setdefault(arm, (i, write_arm))
+                if get_origin(arm) is not None:
+                    arms.setdefault(get_origin(arm), (i, write_arm))
+                if arm == list or get_origin(arm) == list:
+                    arms.setdefault(array.array, (i, write_arm))
+
+            def write_union(obj: any, encoder: BinaryEncoder) -> None:
+                cls = type(obj)
+                try:
+                    index, write = arms[cls]
+                except KeyError:
+                    # Like `UnionCerealizer`, a subclass of an arm uses the closest arm in its MRO from now on.
+                    base = next((base for base in cls.__mro__[1:] if base in arms), None)
+                    if base is None:
+                        raise NotImplementedError()
+                    index, write = arms[cls] = arms[base]
+                encoder.write_long(index)
+                write(obj, encoder)
+
+            return write_union
+
+        if Encrypted == get_origin(t):
+            value_index = _string_branch(schema)
+
+            def write_encrypted(obj: Encrypted, encoder: BinaryEncoder) -> None:
+                payload = self.json_serializer.serialize(obj, t)
+                encoder.write_utf8(payload['key_id'])
+                encoder.write_long(value_index)
+                encoder.write_utf8(payload['value'])
+                encoder.write_utf8(payload['tag'])
+                encoder.write_utf8(payload['nonce'])
+
+            return write_encrypted
+
+        fields = [
+            (name, self._build_writer(field.type, annotation))
+            for (name, annotation, _), field in zip(self._plan(t, SerializationException).fields, schema.fields)
+        ]
+
+        def write_record(obj: any, encoder: BinaryEncoder) -> None:
+            for name, write in fields:
+                write(getattr(obj, name), encoder)
+
+        return write_record
+
+    def _build_reader(self, schema: avro.schema.Schema, t: type, projection: Projection = None) -> Reader:
+        """
+        Builds a reader for data written with `schema` into `t`, following Avro's schema resolution rules. With a
+        `projection`, records are read into partial objects holding only the selected fields.
+        """
+        if Union == get_origin(t) and schema.type != 'union':
+            # The writer didn't have a union here, so read into the arm that matches what it wrote.
+            return self._build_reader(schema, _matching_arm(schema, t), projection)
+
+        if schema.type == 'union':
+            arms = [self._branch_reader(branch, t, projection) for branch in schema.schemas]
+            return lambda decoder: arms[decoder.read_long()](decoder)
+
+        if schema.type == 'null':
+            # An optional reader gets here through its None arm, anything else can't hold a written null.
+            if t is not type(None):
+                raise DeserializationException(f'Cannot read a written "null" into {t}.')
+            return _PRIMITIVE_READERS['null']
+
+        if t == list or get_origin(t) == list:
+            read_item = self._build_reader(schema.items, get_args(t)[0], projection)
+
+            def read_array(decoder: BinaryDecoder) -> list:
+                items = []
+                count = decoder.read_long()
+                while count != 0:
+                    if count < 0:
+                        count = -count
+                        decoder.skip_long()
+                    for _ in range(count):
+                        items.append(read_item(decoder))
+                    count = decoder.read_long()
+                return items
+
+            return read_array
+
+        if projection is not None and (t in BUILTIN_ALIASES or type(t) == EnumMeta or Encrypted == get_origin(t)):
+            raise DeserializationException(f'Cannot select fields within {t}.')
+
+        if t in BUILTIN_ALIASES:
+            alias = BUILTIN_ALIASES[t]
+            if schema.type == alias:
+                return _PRIMITIVE_READERS[alias]
+            promote = _PROMOTIONS.get((schema.type, alias))
+            if promote is None:
+                raise DeserializationException(f'Cannot read a written "{schema.type}" into {t.__name__}.')
+            read_primitive = _PRIMITIVE_READERS[schema.type]
+            return lambda decoder: promote(read_primitive(decoder))
+
+        if type(t) == EnumMeta:
+            members = [t.__members__.get(symbol) for symbol in schema.symbols]
+
+            def read_enum(decoder: BinaryDecoder) -> any:
+                member = members[decoder.read_int()]
+                if member is None:
+                    raise DeserializationException(f'"{t.__name__}" has no member matching the written symbol.')
+                return member
 
+            return read_enum
+
+        if Encrypted == get_origin(t):
+            value_schema = schema.fields_dict['value'].type
+            value_index = _string_branch(schema)
+            datum_reader = DatumReader()
+
+            def read_encrypted(decoder: BinaryDecoder) -> Encrypted:
+                key_id = decoder.read_utf8()
+                index = decoder.read_long()
+                if index == value_index:
+                    value = decoder.read_utf8()
+                else:
+                    branch = value_schema.schemas[index]
+                    value = datum_reader.read_data(branch, branch, decoder)
+                payload = {'key_id': key_id, 'value': value, 'tag': decoder.read_utf8(), 'nonce': decoder.read_utf8()}
+                return self.json_serializer.deserialize(payload, t)
+
+            return read_encrypted
+
+        if schema.type != 'record':
+            raise DeserializationException(f'Cannot read a written "{schema.type}" into {t}.')
+
+        annotations = {name: annotation for name, annotation, _ in self._plan(t, DeserializationException).fields}
+        if projection is not None:
+            return self._build_projection_reader(schema, t, annotations, projection)
+
+        skipper = DatumReader()
+        fields = []
+        for field in schema.fields:
+            if field.name in annotations:
+                fields.append((field.name, self._build_reader(field.type, annotations[field.name])))
+            else:
+                fields.append((None, functools.partial(skipper.skip_data, field.type)))
+
+        parameters = inspect.signature(t.__init__).parameters
+        for name in annotations.keys() - schema.fields_dict.keys():
+            if parameters[name].default is inspect.Parameter.empty:
+                raise DeserializationException(
+                    f'"{t.__module__}.{t.__name__}": "{name}" is not in the written data and has no default.')
+
+        # Held weakly, so the weakly keyed reader cache doesn't keep `t` alive.
+        t_ref = weakref.ref(t)
+        if all(name is not None for name, _ in fields):
+            def read_record(decoder: BinaryDecoder) -> any:
+                return t_ref()(**{name: read(decoder) for name, read in fields})
+        else:
+            def read_record(decoder: BinaryDecoder) -> any:
+                values = {}
+                for name, read in fields:
+                    if name is None:
+                        read(decoder)
+                    else:
+                        values[name] = read(decoder)
+                return t_ref()(**values)
+
+        return read_record
+
+    def _build_projection_reader(self, schema: avro.schema.RecordSchema, t: type, annotations: Dict[str, any],
+                                 projection: Projection) -> Reader:
+        unknown = projection.keys() - annotations.keys()
+        if unknown:
+            raise DeserializationException(f'"{t.__module__}.{t.__name__}" has no field {", ".join(sorted(unknown))}.')
+
+        unwritten = projection.keys() - schema.fields_dict.keys()
+        if unwritten:
+            raise DeserializationException(
+                f'"{t.__module__}.{t.__name__}": {", ".join(sorted(unwritten))} is not in the written data.')
+
+        skipper = DatumReader()
+        fields = []
+        for field in schema.fields:
+            if field.name in projection:
+                read = self._build_reader(field.type, annotations[field.name], projection[field.name])
+                fields.append((field.name, read))
+            else:
+                fields.append((None, functools.partial(skipper.skip_data, field.type)))
+
+        t_ref = weakref.ref(t)
+
+        def read_projection(decoder: BinaryDecoder) -> any:
+            values = []
+            for name, read in fields:
+                if name is None:
+                    read(decoder)
+                else:
+                    values.append((name, read(decoder)))
+            return partial(t_ref(), values)
+
+        return read_projection
+
+    def _branch_reader(self, branch: avro.schema.Schema, t: type, projection: Optional[Projection]) -> Reader:
+        try:
+            arm = _matching_arm(branch, t) if Union == get_origin(t) else t
+            return self._build_reader(branch, arm, projection)
+        except DeserializationException as e:
+            # Only an error if the branch is actually written. `e` itself is unbound once the except block ends.
+            error = e
+
+            def read_unmatched(decoder: BinaryDecoder) -> any:
+                raise error
+
+            return read_unmatched
+
+    def _plan(self, t: type, exception: Type[Exception]) -> FieldPlan:
+        dict_cerealizer = self.json_serializer.registry.default
+        plan = dict_cerealizer.plan(t)
+        if plan.unannotated is not None:
+            # noinspection PyProtectedMember
+            raise exception(dict_cerealizer._unannotated(t, plan))
+        return plan
+
+
+def _primitive_writer(t: type) -> Writer:
+    alias = BUILTIN_ALIASES[t]
+
+    if alias == 'null':
+        return lambda obj, encoder: None
+
+    write = {
+        'string': BinaryEncoder.write_utf8,
+        'int': BinaryEncoder.write_int,
+        'bytes': BinaryEncoder.write_bytes,
+        'double': BinaryEncoder.write_double,
+        'boolean': BinaryEncoder.write_boolean,
+    }[alias]
+
+    def write_primitive(obj: any, encoder: BinaryEncoder) -> None:
+        # Converted like `PassthruCerealizer` does, and rejected like avro's own validation would.
+        if obj is None:
+            raise SerializationException(f'None is not an example of the schema "{alias}".')
+        obj = t(obj)
+        if alias == 'int' and obj not in INT_RANGE:
+            raise SerializationException(f'{obj} is not an example of the schema "{alias}".')
+        write(encoder, obj)
+
+    return write_primitive
+
+
+_PRIMITIVE_READERS: Dict[str, Reader] = {
+    'string': BinaryDecoder.read_utf8,
+    'int': BinaryDecoder.read_int,
+    'long': BinaryDecoder.read_long,
+    'float': BinaryDecoder.read_float,
+    'bytes': BinaryDecoder.read_bytes,
+    'double': BinaryDecoder.read_double,
+    'boolean': BinaryDecoder.read_boolean,
+    'null': BinaryDecoder.read_null,
+}
+
+
+#: The promotions allowed by Avro's schema resolution, by written and read type. A long can't be read into an int,
+#: even though both are Python ints here.
+_PROMOTIONS: Dict[Tuple[str, str], Callable[[any], any]] = {
+    ('int', 'double'): float,
+    ('long', 'double'): float,
+    ('float', 'double'): float,
+    ('string', 'bytes'): lambda value: value.encode('utf-8'),
+    ('bytes', 'string'): lambda value: value.decode('utf-8'),
+}
+
+
+def _read_long(fileobj: IO[bytes]) -> Optional[int]:
+    """
+    Reads a zig-zag varint like `BinaryDecoder.read_long`, but returns None at the end of the file.
+    """
+    b = fileobj.read(1)
+    if not b:
         return None
+
+    b = b[0]
+    n = b & 0x7F
+    shift = 7
+    while b & 0x80:
+        b = fileobj.read(1)
+        if not b:
+            raise DeserializationException('Avro block is truncated.')
+        b = b[0]
+        n |= (b & 0x7F) << shift
+        shift += 7
+    return (n >> 1) ^ -(n & 1)
+
+
+def _varint(view: memoryview, position: int) -> Tuple[int, int]:
+    """
+    Reads a zig-zag varint from `view` at `position`, returning it and the position after it.
+    """
+    b = view[position]
+    n = b & 0x7F
+    shift = 7
+    while b & 0x80:
+        position += 1
+        b = view[position]
+        n |= (b & 0x7F) << shift
+        shift += 7
+    return (n >> 1) ^ -(n & 1), position + 1
+
+
+def _block_decoder(codec: str, data: Union[bytes, memoryview]) -> BinaryDecoder:
+    if codec == NULL_CODEC:
+        return BinaryDecoder(io.BytesIO(data))
+    if codec == DEFLATE_CODEC:
+        return BinaryDecoder(io.BytesIO(zlib.decompress(data, -15)))
+
+    # avro's codecs read the length prefixed block from a decoder themselves.
+    with io.BytesIO() as bytes_io:
+        BinaryEncoder(bytes_io).write_bytes(data)
+        return avro.codecs.get_codec(codec).decompress(BinaryDecoder(io.BytesIO(bytes_io.getvalue())))
+
+
+def _matching_arm(schema: avro.schema.Schema, t: type) -> type:
+    """
+    The first arm of the union `t` that data written with `schema` can be read into.
+    """
+    for arm in get_args(t):
+        if arm in BUILTIN_ALIASES:
+            if BUILTIN_ALIASES[arm] == schema.type:
+                return arm
+        elif arm == list or get_origin(arm) == list:
+            if schema.type == 'array':
+                return arm
+        elif Encrypted == get_origin(arm):
+            if schema.type == 'record' and schema.name == Encrypted.__name__:
+                return arm
+        elif schema.type in ('record', 'enum') and schema.name == getattr(arm, '__name__', None):
+            return arm
+
+    # Failing an exact match, the first primitive arm the written type can be promoted to.
+    for arm in get_args(t):
+        if arm in BUILTIN_ALIASES and (schema.type, BUILTIN_ALIASES[arm]) in _PROMOTIONS:
+            return arm
+
+    raise DeserializationException(f'No arm of {t} matches the written "{schema.type}".')
+
+
+def _string_branch(encrypted_schema: avro.schema.RecordSchema) -> int:
+    """
+    The index of the string branch in the `value` union of an `Encrypted` record, which holds the ciphertext.
+    """
+    value_schema = encrypted_schema.fields_dict['value'].type
+    return next(i for i, branch in enumerate(value_schema.schemas) if branch.type == 'string')
@@ -1,5 +1,8 @@
+import array
+import dataclasses
 import inspect
 import typing
+import weakref
 
 from super_cereal.cerealizer import Cerealizer, T, V, SerializationException, DeserializationException
 
@@ -13,6 +16,8 @@ class PassthruCerealizer(Cerealizer[any, any]):
 
 
 class EnumCerealizer(Cerealizer):
+    serialized_types = (str,)
+
     def serialize(self, obj: any, t: T = None) -> V:
         return obj.name
 
@@ -21,76 +26,213 @@ class EnumCerealizer(Cerealizer):
 
 
 class ListCerealizer(Cerealizer):
+    serialized_types = (list,)
+
+    #: `array.array` type codes for `numeric_arrays`.
+    ARRAY_TYPECODES = {float: 'd', int: 'q'}
+
+    def __init__(self, encryption_keys: typing.Dict[str, bytes] = None, numeric_arrays: bool = False):
+        """
+        :param numeric_arrays: deserialize `List[float]` and `List[int]` into an `array.array`, which stores the
+            numbers unboxed. Falls back to a list when a value doesn't fit.
+        """
+        super().__init__(encryption_keys)
+        self.numeric_arrays = numeric_arrays
+
     def serialize(self, obj: any, t: T = None) -> V:
         t = typing.get_args(t)[0]
-        return [self.registry[t].serialize(v, t) for v in obj]
+        cerealizer = self.registry[t]
+
+        if type(cerealizer) is PassthruCerealizer:
+            if type(obj) is array.array:
+                return obj.tolist()
+            # Values that already have the right type would come out unchanged, so only the list is copied.
+            if set(map(type, obj)) <= {t}:
+                return list(obj)
+
+        return [cerealizer.serialize(v, t) for v in obj]
 
     def deserialize(self, obj: V, t: T) -> T:
         t = typing.get_args(t)[0]
-        return [self.registry[t].deserialize(v, t) for v in obj]
+        cerealizer = self.registry[t]
+
+        if type(cerealizer) is not PassthruCerealizer:
+            return [cerealizer.deserialize(v, t) for v in obj]
+
+        if type(obj) is not list or not set(map(type, obj)) <= {t}:
+            obj = [cerealizer.deserialize(v, t) for v in obj]
+
+        if self.numeric_arrays and t in self.ARRAY_TYPECODES:
+            try:
+                return array.array(self.ARRAY_TYPECODES[t], obj)
+            except (OverflowError, TypeError):
+                pass
+
+        # Already the right type throughout, so the decoded list is returned as is rather than copied.
+        return obj
 
 
 class UnionCerealizer(Cerealizer):
-    def serialize(self, obj: any, t: T = None) -> V:
-        for t1 in typing.get_args(t):
-            if type(obj) == t1:
-                return self.registry[t1].serialize(obj, t1)
-            if type(obj) == typing.get_origin(t1):
-                return self.registry[t1].serialize(obj, t1)
+    def __init__(self, encryption_keys: typing.Dict[str, bytes] = None):
+        super().__init__(encryption_keys)
+        self.tables: typing.Dict[typing.Tuple[any, bool], typing.Dict[type, typing.Tuple[any, Cerealizer]]] = {}
+
+    def invalidate(self):
+        self.tables.clear()
+
+    def table(self, t: T, serialized: bool = False) -> typing.Dict[type, typing.Tuple[any, Cerealizer]]:
+        """
+        Returns the dispatch table for the Union `t`, mapping a runtime type to the arm it belongs to and that arm's
+        cerealizer. An arm is matched by its own type or its generic origin, and the first matching arm wins. A list
+        arm also matches an `array.array`.
+
+        The `serialized` table, used for deserializing, also falls back to each arm's `serialized_types`, so an enum
+        arm matches a str and an object arm matches a dict when no arm matches them exactly.
+        """
+        try:
+            return self.tables[t, serialized]
+        except KeyError:
+            pass
+
+        table = {}
+        arms = [(arm, self.registry[arm]) for arm in typing.get_args(t)]
+        for entry in arms:
+            arm = entry[0]
+            if isinstance(arm, type):
+                table.setdefault(arm, entry)
+            if typing.get_origin(arm) is not None:
+                table.setdefault(typing.get_origin(arm), entry)
+            if arm is list or typing.get_origin(arm) is list:
+                # `numeric_arrays` deserializes lists into arrays, which have to find their way back to the list arm.
+                table.setdefault(array.array, entry)
+
+        if serialized:
+            for entry in arms:
+                for serialized_type in entry[1].serialized_types:
+                    table.setdefault(serialized_type, entry)
+
+        self.tables[t, serialized] = table
+        return table
+
+    def _arm(self, obj: any, t: T, serialized: bool) -> typing.Tuple[any, Cerealizer]:
+        table = self.table(t, serialized)
+        cls = type(obj)
+        try:
+            return table[cls]
+        except KeyError:
+            pass
+
+        # A subclass of an arm, e.g. a bool for an int arm, uses the closest arm in its MRO from now on.
+        for base in cls.__mro__[1:]:
+            if base in table:
+                entry = table[cls] = table[base]
+                return entry
 
         raise NotImplementedError()
 
+    def serialize(self, obj: any, t: T = None) -> V:
+        arm, cerealizer = self._arm(obj, t, False)
+        return cerealizer.serialize(obj, arm)
+
     def deserialize(self, obj: V, t: T) -> T:
-        args = typing.get_args(t)
-        for arg in args:
-            if arg == type(obj):
-                return self.registry[arg].deserialize(obj, arg)
-            if typing.get_origin(arg) == type(obj):
-                return self.registry[arg].deserialize(obj, arg)
+        arm, cerealizer = self._arm(obj, t, True)
+        return cerealizer.deserialize(obj, arm)
 
-        raise NotImplementedError()
 
+class FieldPlan(typing.NamedTuple):
+    """
+    Everything `DictCerealizer` needs to know about a type, resolved once: the `__init__` parameters in order, with
+    their annotations and the cerealizers the registry resolved for them.
 
-class DictCerealizer(Cerealizer):
-    def serialize(self, obj: any, t: T = None) -> V:
-        if t == dict or typing.get_origin(t) == dict:
-            return obj
+    `unannotated` names the first parameter without an annotation, in which case `fields` is empty. `frozen` is set
+    for frozen dataclasses, whose equal instances can be shared.
+    """
+    fields: typing.Tuple[typing.Tuple[str, any, Cerealizer], ...]
+    unannotated: typing.Optional[str] = None
+    frozen: bool = False
 
+
+class DictCerealizer(Cerealizer):
+    serialized_types = (dict,)
+
+    def __init__(self, encryption_keys: typing.Dict[str, bytes] = None):
+        super().__init__(encryption_keys)
+        self.plans: typing.MutableMapping[type, FieldPlan] = weakref.WeakKeyDictionary()
+        #: An `InternTable` that deserialized frozen dataclasses are shared through, if its `frozen_dataclasses` is set.
+        self.intern_table = None
+
+    def invalidate(self):
+        self.plans.clear()
+
+    def plan(self, t: type) -> FieldPlan:
+        """
+        Returns the cached `FieldPlan` for `t`, building it the first time `t` is seen. Plans are weakly keyed by type
+        so classes defined at runtime can still be collected.
+        """
+        try:
+            return self.plans[t]
+        except KeyError:
+            pass
+        except TypeError:
+            # Not weakly referenceable, so it can't be cached.
+            return self._build_plan(t)
+
+        plan = self._build_plan(t)
+        self.plans[t] = plan
+        return plan
+
+    def _build_plan(self, t: type) -> FieldPlan:
         # noinspection PyTypeChecker
-        fields: typing.List[typing.Tuple[str, inspect.Parameter]] = list(
+        params: typing.List[typing.Tuple[str, inspect.Parameter]] = list(
             inspect.signature(t.__init__).parameters.items())[1:]
 
-        for field, param in fields:
+        for field, param in params:
             # noinspection PyUnresolvedReferences,PyProtectedMember
             if param.annotation == inspect._empty:
-                class_name = f'"{t.__module__}.{t.__name__}"'
-                raise SerializationException(f'{class_name}: "{field}" has no annotation.')
+                return FieldPlan((), field)
 
-        fixed_fields = {}
+        frozen = dataclasses.is_dataclass(t) and t.__dataclass_params__.frozen
+        return FieldPlan(tuple((field, param.annotation, self.registry[param.annotation]) for field, param in params),
+                         frozen=frozen)
 
-        for field, param in fields:
-            cerealizer = self.registry[param.annotation]
-            fixed_fields[field] = cerealizer.serialize(getattr(obj, field), param.annotation)
+    def field_values(self, obj: V, t: T) -> typing.Mapping[str, V]:
+        """
+        The serialized fields of `obj` by name, still to be deserialized, for reading only some of them.
+        """
+        return obj
 
-        return fixed_fields
+    def _intern(self, obj: T, plan: FieldPlan) -> T:
+        if plan.frozen and self.intern_table is not None and self.intern_table.frozen_dataclasses:
+            return self.intern_table.intern(obj)
+        return obj
 
-    def deserialize(self, obj: V, t: T) -> T:
+    @staticmethod
+    def _unannotated(t: type, plan: FieldPlan) -> str:
+        class_name = f'"{t.__module__}.{t.__name__}"'
+        return f'{class_name}: "{plan.unannotated}" has no annotation.'
+
+    def serialize(self, obj: any, t: T = None) -> V:
         if t == dict or typing.get_origin(t) == dict:
             return obj
 
-        # noinspection PyTypeChecker
-        fields: typing.List[
-            typing.Tuple[str, inspect.Parameter]] = list(inspect.signature(t.__init__).parameters.items())[1:]
-
-        for field, param in fields:
-            # noinspection PyUnresolvedReferences,PyProtectedMember
-            if param.annotation == inspect._empty:
-                class_name = f'"{t.__module__}.{t.__name__}"'
-                raise DeserializationException(f'{class_name}: "{field}" has no annotation.')
+        plan = self.plan(t)
+        if plan.unannotated is not None:
+            raise SerializationException(self._unannotated(t, plan))
 
-        fixed = {
-            field: self.registry[param.annotation].deserialize(obj[field], param.annotation)
-            for field, param in fields
+        return {
+            field: cerealizer.serialize(getattr(obj, field), annotation)
+            for field, annotation, cerealizer in plan.fields
         }
 
-        return t(**fixed)
+    def deserialize(self, obj: V, t: T) -> T:
+        if t == dict or typing.get_origin(t) == dict:
+            return obj
+
+        plan = self.plan(t)
+        if plan.unannotated is not None:
+            raise DeserializationException(self._unannotated(t, plan))
+
+        return self._intern(t(**{
+            field: cerealizer.deserialize(obj[field], annotation)
+            for field, annotation, cerealizer in plan.fields
+        }), plan)
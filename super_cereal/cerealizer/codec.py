@@ -0,0 +1,69 @@
+import abc
+import json
+
+
+class JsonCodec(abc.ABC):  # pragma: no cover
+    """
+    Turns the JSON types produced by `JsonCerealizer` into bytes and back.
+    """
+
+    @abc.abstractmethod
+    def dumps(self, obj: any) -> bytes:
+        pass
+
+    @abc.abstractmethod
+    def loads(self, data: bytes) -> any:
+        pass
+
+
+class StdlibJsonCodec(JsonCodec):
+    """
+    The `json` module, producing the same bytes as `json.dumps(obj).encode()`.
+    """
+
+    def __init__(self) -> None:
+        self.encoder = json.JSONEncoder()
+
+    def dumps(self, obj: any) -> bytes:
+        # The output is ASCII only, so encoding it is a plain copy.
+        return self.encoder.encode(obj).encode('ascii')
+
+    def loads(self, data: bytes) -> any:
+        return json.loads(data)
+
+
+class OrjsonCodec(JsonCodec):
+    """
+    orjson, which reads and writes bytes natively. Non-string dict keys are written as strings, like `json` does.
+    Requires orjson to be installed.
+    """
+
+    def __init__(self) -> None:
+        import orjson
+
+        self._dumps = orjson.dumps
+        self._loads = orjson.loads
+        self.option = orjson.OPT_NON_STR_KEYS
+
+    @staticmethod
+    def enabled() -> bool:
+        try:
+            import orjson
+            return True
+        except ImportError:
+            return False
+
+    def dumps(self, obj: any) -> bytes:
+        return self._dumps(obj, option=self.option)
+
+    def loads(self, data: bytes) -> any:
+        return self._loads(data)
+
+
+def best_codec() -> JsonCodec:
+    """
+    The fastest codec that is installed. Note its output is not guaranteed to be byte for byte identical to `json`.
+    """
+    if OrjsonCodec.enabled():
+        return OrjsonCodec()
+    return StdlibJsonCodec()
@@ -0,0 +1,152 @@
+import itertools
+import typing
+import weakref
+
+from super_cereal.cerealizer import T, V, SerializationException, DeserializationException
+from super_cereal.cerealizer.builtins import DictCerealizer, PassthruCerealizer, EnumCerealizer, ListCerealizer, \
+    UnionCerealizer
+
+#: The generated `serialize(obj)` and `deserialize(obj, t)`. The type is passed in rather than held by the generated
+#: code, so the weakly keyed cache doesn't keep it alive.
+Compiled = typing.Tuple[typing.Callable[[any], any], typing.Callable[[any, type], any]]
+
+
+class CompiledDictCerealizer(DictCerealizer):
+    """
+    A `DictCerealizer` that generates a straight-line serialize and deserialize function per type the first time the
+    type is seen. Primitives, enums and lists of objects are inlined, nested types handled by this cerealizer are
+    called directly and anything else is handed to the cerealizer the registry resolved for it, so the output matches
+    `DictCerealizer`.
+
+    Use it as the registry default (`JsonCerealizer(compiled=True)`) or only for hot types
+    (`cerealizer.registry[Message] = CompiledDictCerealizer()`).
+    """
+
+    def __init__(self, encryption_keys: typing.Dict[str, bytes] = None):
+        super().__init__(encryption_keys)
+        self.compiled: typing.MutableMapping[type, Compiled] = weakref.WeakKeyDictionary()
+        self._compiling: typing.Set[type] = set()
+
+    def invalidate(self):
+        super().invalidate()
+        self.compiled.clear()
+
+    def serialize(self, obj: any, t: T = None) -> V:
+        compiled = self.compile(t)
+        if compiled is None:
+            if t == dict or typing.get_origin(t) == dict:
+                return obj
+            raise SerializationException(self._unannotated(t, self.plan(t)))
+
+        return compiled[0](obj)
+
+    def deserialize(self, obj: V, t: T) -> T:
+        compiled = self.compile(t)
+        if compiled is None:
+            if t == dict or typing.get_origin(t) == dict:
+                return obj
+            raise DeserializationException(self._unannotated(t, self.plan(t)))
+
+        return compiled[1](obj, t)
+
+    def compile(self, t: type) -> typing.Optional[Compiled]:
+        """
+        Returns the generated `(serialize, deserialize)` functions for `t`, or None when `t` is a dict or has an
+        unannotated field.
+        """
+        try:
+            return self.compiled[t]
+        except KeyError:
+            pass
+        except TypeError:
+            return self._compile(t)
+
+        compiled = self._compile(t)
+        if compiled is not None:
+            self.compiled[t] = compiled
+        return compiled
+
+    def _compile(self, t: type) -> typing.Optional[Compiled]:
+        if t == dict or typing.get_origin(t) == dict:
+            return None
+
+        plan = self.plan(t)
+        if plan.unannotated is not None:
+            return None
+
+        self._compiling.add(t)
+        try:
+            return _Generator(self, t).generate(plan)
+        finally:
+            self._compiling.discard(t)
+
+
+class _Generator:
+    def __init__(self, owner: CompiledDictCerealizer, t: type) -> None:
+        self.owner = owner
+        self.t = t
+        self.namespace: typing.Dict[str, any] = {}
+        self.counter = itertools.count()
+
+    def constant(self, value: any) -> str:
+        name = f'_k{next(self.counter)}'
+        self.namespace[name] = value
+        return name
+
+    def variable(self) -> str:
+        return f'_v{next(self.counter)}'
+
+    def generate(self, plan) -> Compiled:
+        serialize_lines = ['def serialize(obj):']
+        deserialize_lines = ['def deserialize(obj, t):']
+        serialized = []
+        deserialized = []
+
+        for field, annotation, cerealizer in plan.fields:
+            var = self.variable()
+            serialize_lines.append(f'    {var} = obj.{field}')
+            serialized.append(f'{field!r}: {self.expression(var, annotation, cerealizer, serialize=True)}')
+            deserialize_lines.append(f'    {var} = obj[{field!r}]')
+            deserialized.append(f'{field}={self.expression(var, annotation, cerealizer, serialize=False)}')
+
+        serialize_lines.append(f'    return {{{", ".join(serialized)}}}')
+        deserialize_lines.append(f'    return t({", ".join(deserialized)})')
+
+        source = '\n'.join(serialize_lines + deserialize_lines)
+        exec(compile(source, f'<super_cereal.compiled {self.t.__module__}.{self.t.__qualname__}>', 'exec'),
+             self.namespace)
+
+        return self.namespace['serialize'], self.namespace['deserialize']
+
+    def expression(self, var: str, annotation: any, cerealizer, serialize: bool) -> str:
+        if type(cerealizer) is PassthruCerealizer:
+            return f'(None if {var} is None else {self.constant(annotation)}({var}))'
+        if type(cerealizer) is UnionCerealizer and all(
+                type(self.owner.registry[arm]) is PassthruCerealizer for arm in typing.get_args(annotation)):
+            # A matching primitive arm converts the value to its own type, which leaves it unchanged.
+            method = 'serialize' if serialize else 'deserialize'
+            arms = self.constant(frozenset(typing.get_args(annotation)))
+            return f'({var} if type({var}) in {arms} else ' \
+                   f'{self.constant(cerealizer)}.{method}({var}, {self.constant(annotation)}))'
+        if type(cerealizer) is EnumCerealizer:
+            return f'{var}.name' if serialize else f'{self.constant(annotation)}[{var}]'
+        if type(cerealizer) is ListCerealizer and typing.get_args(annotation):
+            item_annotation = typing.get_args(annotation)[0]
+            item_cerealizer = self.owner.registry[item_annotation]
+            # Lists of primitives are left to ListCerealizer's fast path.
+            if type(item_cerealizer) is not PassthruCerealizer:
+                item = self.variable()
+                item_expression = self.expression(item, item_annotation, item_cerealizer, serialize)
+                return f'[{item_expression} for {item} in {var}]'
+        if annotation == dict or typing.get_origin(annotation) == dict:
+            if isinstance(cerealizer, DictCerealizer):
+                return var
+        if cerealizer is self.owner and annotation not in self.owner._compiling:
+            compiled = self.owner.compile(annotation)
+            if compiled is not None:
+                if serialize:
+                    return f'{self.constant(compiled[0])}({var})'
+                return f'{self.constant(compiled[1])}({var}, {self.constant(annotation)})'
+
+        method = 'serialize' if serialize else 'deserialize'
+        return f'{self.constant(cerealizer)}.{method}({var}, {self.constant(annotation)})'
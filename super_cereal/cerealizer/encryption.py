@@ -1,13 +1,22 @@
 import base64
+import concurrent.futures
+import contextlib
+import copy
 import dataclasses
-import json
+import functools
+import threading
 import typing
 from typing import Generic, TypeVar, Dict
 
-from super_cereal.cerealizer import Cerealizer, T
+from super_cereal.cerealizer import Cerealizer, T, SerializationException
+from super_cereal.cerealizer.codec import JsonCodec, StdlibJsonCodec
 
 E = TypeVar('E')
 
+#: pycryptodome's default GCM nonce and tag sizes, used by envelopes.
+NONCE_SIZE = 16
+TAG_SIZE = 16
+
 
 @dataclasses.dataclass
 class Encrypted(Generic[E]):
@@ -26,11 +35,79 @@ class Encrypted(Generic[E]):
         return f'Encrypted(key_id={self.key_id}, value=***)'
 
 
+class LazyEncrypted(Encrypted[E]):
+    """
+    An `Encrypted` read by a lazy `EncryptedCerealizer`. It holds the ciphertext until `value` is first read, then
+    decrypts, deserializes and keeps the plaintext. A bad key or tampered ciphertext is only reported at that point.
+
+    Serializing it again before `value` has been read, or `key_id` changed, writes out the original ciphertext
+    unchanged. Pickling or copying it decrypts it and produces a plain `Encrypted`, so neither the cerealizer nor its
+    keys are copied along.
+    """
+
+    def __init__(self, key_id: str, decrypt: typing.Callable[[], E], serialized: typing.Union[str, dict]) -> None:
+        self._key_id = key_id
+        self._decrypt = decrypt
+        self._serialized = serialized
+        self._value = None
+
+    @property
+    def key_id(self) -> str:
+        return self._key_id
+
+    @key_id.setter
+    def key_id(self, key_id: str) -> None:
+        self._key_id = key_id
+        # The ciphertext is for the old key, so it is encrypted again for the new one.
+        self._serialized = None
+
+    @property
+    def value(self) -> typing.Optional[E]:
+        if self._decrypt is not None:
+            self._value = self._decrypt()
+            self._decrypt = None
+            # The plaintext may be changed in place from here on, so the ciphertext can no longer be reused.
+            self._serialized = None
+        return self._value
+
+    @value.setter
+    def value(self, value: typing.Optional[E]) -> None:
+        self._value = value
+        self._decrypt = None
+        self._serialized = None
+
+    @property
+    def decrypted(self) -> bool:
+        return self._decrypt is None
+
+    def __eq__(self, other):
+        if not isinstance(other, Encrypted):
+            return NotImplemented
+        return self.key_id == other.key_id and self.value == other.value
+
+    def __reduce__(self):
+        return Encrypted, (self.key_id, self.value)
+
+    def __deepcopy__(self, memo: dict) -> Encrypted[E]:
+        return Encrypted(self.key_id, copy.deepcopy(self.value, memo))
+
+
 class EncryptedCerealizer(Cerealizer[Encrypted[E], Dict[str, E]]):
+    serialized_types = (dict, str)
 
-    def __init__(self, keys: Dict[str, bytes], value_cerealizer: Cerealizer) -> None:
+    def __init__(self, keys: Dict[str, bytes], value_cerealizer: Cerealizer, codec: JsonCodec = None,
+                 envelope: bool = False, lazy: bool = False) -> None:
+        """
+        :param envelope: serialize to a single base64 string holding the key id length, key id, nonce, tag and
+            ciphertext, instead of a dict of four base64 strings. Both forms can always be deserialized.
+        :param lazy: deserialize to `LazyEncrypted`, which only decrypts when its value is read.
+        """
+        self._batch = threading.local()
         super().__init__(keys)
         self.value_cerealizer = value_cerealizer
+        self.codec = codec or StdlibJsonCodec()
+        self.envelope = envelope
+        self.lazy = lazy
 
     @staticmethod
     def enabled() -> bool:
@@ -40,19 +117,75 @@ class EncryptedCerealizer(Cerealizer[Encrypted[E], Dict[str, E]]):
         except ImportError:
             return False
 
+    @contextlib.contextmanager
+    def batch(self, executor: concurrent.futures.Executor) -> typing.Iterator['EncryptionBatch']:
+        """
+        While active, `serialize` and `deserialize` on this thread only queue their AES and JSON work and return
+        placeholders, which are filled in on `executor` when the block exits. pycryptodome releases the GIL while
+        encrypting, so a thread pool runs the queue in parallel.
+
+        Placeholders must not be read before the block exits, and envelopes serialized in the block are only in
+        place once the output has been passed through `EncryptionBatch.resolve`.
+        """
+        self._batch.pending = batch = EncryptionBatch()
+        try:
+            yield batch
+        finally:
+            del self._batch.pending
+
+        for _ in executor.map(_run, batch.jobs):
+            pass
+
+    def _cipher(self, key_id: str) -> typing.Callable[..., any]:
+        """
+        Returns a factory for GCM ciphers with the key for `key_id`. The key is looked up on every call, so keys can be
+        rotated in `encryption_keys` in place. Raises KeyError if there is no such key.
+        """
+        from Crypto.Cipher import AES
+
+        return functools.partial(AES.new, self.encryption_keys[key_id], AES.MODE_GCM)
+
     def serialize(self, obj: Encrypted[E], t: T = None) -> Dict[str, E]:
         """
         https://pycryptodome.readthedocs.io/en/latest/src/cipher/modern.html?highlight=gcm#gcm-mode
         """
-        from Crypto.Cipher import AES
+        if type(obj) is LazyEncrypted and obj._serialized is not None \
+                and isinstance(obj._serialized, str) == self.envelope:
+            return obj._serialized if self.envelope else dict(obj._serialized)
 
         if t:
             t = typing.get_args(obj)
         if not t:
             t = type(obj.value)
 
-        cipher = AES.new(self.encryption_keys[obj.key_id], AES.MODE_GCM)
-        ciphertext, tag = cipher.encrypt_and_digest(json.dumps(self.value_cerealizer.serialize(obj.value, t)).encode())
+        batch = getattr(self._batch, 'pending', None)
+        if batch is None:
+            return self._encrypt(obj, t)
+
+        if self.envelope:
+            serialized = _Envelope()
+            batch.envelopes = True
+
+            def encrypt() -> None:
+                serialized.value = self._encrypt(obj, t)
+        else:
+            serialized = {'key_id': obj.key_id}
+
+            def encrypt() -> None:
+                serialized.update(self._encrypt(obj, t))
+
+        batch.jobs.append(encrypt)
+        return serialized
+
+    def _encrypt(self, obj: Encrypted[E], t: T) -> typing.Union[str, Dict[str, E]]:
+        cipher = self._cipher(obj.key_id)()
+        ciphertext, tag = cipher.encrypt_and_digest(self.codec.dumps(self.value_cerealizer.serialize(obj.value, t)))
+
+        if self.envelope:
+            key_id = obj.key_id.encode()
+            if len(key_id) > 255:
+                raise SerializationException(f'Key id "{obj.key_id}" is longer than 255 bytes.')
+            return base64.b64encode(b''.join((bytes((len(key_id),)), key_id, cipher.nonce, tag, ciphertext))).decode()
 
         return {
             'key_id': obj.key_id,
@@ -61,18 +194,96 @@ class EncryptedCerealizer(Cerealizer[Encrypted[E], Dict[str, E]]):
             'nonce': base64.b64encode(cipher.nonce).decode()
         }
 
-    def deserialize(self, obj: Dict[str, E], t: Encrypted[E]) -> Encrypted[E]:
-        from Crypto.Cipher import AES
-
+    def deserialize(self, obj: typing.Union[str, Dict[str, E]], t: Encrypted[E]) -> Encrypted[E]:
         t = typing.get_args(t)[0]
 
+        if isinstance(obj, str):
+            sealed = _open_envelope(obj)
+        else:
+            sealed = _Sealed(obj['key_id'], base64.b64decode(obj['nonce']), base64.b64decode(obj['tag']),
+                             base64.b64decode(obj['value']))
+
         try:
-            key_id = self.encryption_keys[obj['key_id']]
+            cipher = self._cipher(sealed.key_id)
         except KeyError:
-            return Encrypted(obj['key_id'], None)
+            return Encrypted(sealed.key_id, None)
+
+        if self.lazy:
+            return LazyEncrypted(sealed.key_id, functools.partial(self._decrypt, cipher, sealed, t), obj)
+
+        batch = getattr(self._batch, 'pending', None)
+        if batch is None:
+            return Encrypted(key_id=sealed.key_id, value=self._decrypt(cipher, sealed, t))
+
+        deserialized = Encrypted(key_id=sealed.key_id, value=None)
+
+        def decrypt() -> None:
+            deserialized.value = self._decrypt(cipher, sealed, t)
+
+        batch.jobs.append(decrypt)
+        return deserialized
+
+    def _decrypt(self, cipher: typing.Callable[..., any], sealed: '_Sealed', t: T) -> E:
+        plaintext = cipher(nonce=sealed.nonce).decrypt_and_verify(sealed.ciphertext, sealed.tag)
+
+        payload = self.codec.loads(plaintext)
+        return self.value_cerealizer.deserialize(payload, t)
+
+
+class EncryptionBatch:
+    """
+    The work queued by `EncryptedCerealizer.batch`.
+    """
+
+    def __init__(self) -> None:
+        self.jobs: typing.List[typing.Callable[[], None]] = []
+        self.envelopes = False
+
+    def resolve(self, obj: any) -> any:
+        """
+        Replaces the envelope placeholders in serialized output with the envelopes themselves. Must be called after
+        the batch has exited.
+        """
+        if not self.envelopes:
+            return obj
+        return _resolve(obj)
+
+
+class _Envelope:
+    __slots__ = ('value',)
+
+
+class _Sealed(typing.NamedTuple):
+    key_id: str
+    nonce: typing.Union[bytes, memoryview]
+    tag: typing.Union[bytes, memoryview]
+    ciphertext: typing.Union[bytes, memoryview]
+
+
+def _open_envelope(obj: str) -> _Sealed:
+    blob = memoryview(base64.b64decode(obj))
+    nonce = 1 + blob[0]
+    tag = nonce + NONCE_SIZE
+    ciphertext = tag + TAG_SIZE
+    return _Sealed(str(blob[1:nonce], 'utf-8'), blob[nonce:tag], blob[tag:ciphertext], blob[ciphertext:])
+
+
+_CONTAINERS = {_Envelope, dict, list}
+
+
+def _resolve(obj: any) -> any:
+    if type(obj) is _Envelope:
+        return obj.value
+    if type(obj) is dict:
+        for key, value in obj.items():
+            if type(value) in _CONTAINERS:
+                obj[key] = _resolve(value)
+    elif type(obj) is list:
+        for i, value in enumerate(obj):
+            if type(value) in _CONTAINERS:
+                obj[i] = _resolve(value)
+    return obj
 
-        cipher = AES.new(key_id, AES.MODE_GCM, nonce=base64.b64decode(obj['nonce']))
-        plaintext = cipher.decrypt_and_verify(base64.b64decode(obj['value']), base64.b64decode(obj['tag']))
 
-        payload = json.loads(plaintext)
-        return Encrypted(key_id=obj['key_id'], value=self.value_cerealizer.deserialize(payload, t))
+def _run(job: typing.Callable[[], None]) -> None:
+    job()
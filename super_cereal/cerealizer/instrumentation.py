@@ -0,0 +1,129 @@
+import threading
+import time
+import typing
+
+from super_cereal.cerealizer import Cerealizer, T, V
+from super_cereal.cerealizer.builtins import PassthruCerealizer
+
+SERIALIZE = 'serialize'
+DESERIALIZE = 'deserialize'
+
+
+class Event(typing.NamedTuple):
+    #: `SERIALIZE` or `DESERIALIZE`.
+    operation: str
+    type: any
+    #: 1 for a timed call, 0 when only reporting a size.
+    calls: int
+    seconds: float
+    #: The size of the serialized form, when the cerealizer produces bytes.
+    bytes: int
+
+
+class TypeStats:
+    __slots__ = ('calls', 'seconds', 'bytes')
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.seconds = 0.0
+        self.bytes = 0
+
+    def as_dict(self) -> typing.Dict[str, typing.Union[int, float]]:
+        return {'calls': self.calls, 'seconds': self.seconds, 'bytes': self.bytes}
+
+
+class Instrumentation:
+    """
+    Counts calls, time and bytes per type and operation. Enable it with `registry.instrumentation = Instrumentation()`
+    on a `TheTypeRegistry`, or `AvroCerealizer.instrumentation`. Disabled, it costs nothing.
+
+    Every cerealizer the registry resolves, other than for primitives, is timed. The time of a type includes that of
+    the types nested in it. `JsonByteCerealizer` and `AvroCerealizer` also count the bytes of the types they are
+    called with.
+    """
+
+    def __init__(self, callback: typing.Callable[[Event], None] = None) -> None:
+        """
+        :param callback: called with every `Event`, for instance to export it, on the thread that made the call.
+        """
+        self.callback = callback
+        self.stats: typing.Dict[typing.Tuple[str, str], TypeStats] = {}
+        self._lock = threading.Lock()
+        self._wrapped: typing.Dict[int, typing.Tuple[Cerealizer, '_InstrumentedCerealizer']] = {}
+
+    def record(self, event: Event) -> None:
+        key = (event.operation, type_name(event.type))
+        with self._lock:
+            stats = self.stats.get(key)
+            if stats is None:
+                stats = self.stats[key] = TypeStats()
+            stats.calls += event.calls
+            stats.seconds += event.seconds
+            stats.bytes += event.bytes
+
+        if self.callback is not None:
+            self.callback(event)
+
+    def snapshot(self) -> typing.Dict[str, typing.Dict[str, typing.Dict[str, typing.Union[int, float]]]]:
+        """
+        Returns `{operation: {type name: {'calls': ..., 'seconds': ..., 'bytes': ...}}}`.
+        """
+        snapshot = {SERIALIZE: {}, DESERIALIZE: {}}
+        with self._lock:
+            for (operation, name), stats in self.stats.items():
+                snapshot[operation][name] = stats.as_dict()
+        return snapshot
+
+    def reset(self) -> None:
+        with self._lock:
+            self.stats.clear()
+
+    def wrap(self, cerealizer: Cerealizer) -> Cerealizer:
+        """
+        Returns `cerealizer`, timed. Primitives are left alone, since they are called far too often to time.
+        """
+        if isinstance(cerealizer, PassthruCerealizer):
+            return cerealizer
+
+        wrapped = self._wrapped.get(id(cerealizer))
+        if wrapped is None:
+            wrapped = self._wrapped[id(cerealizer)] = (cerealizer, _InstrumentedCerealizer(cerealizer, self))
+        return wrapped[1]
+
+
+class _InstrumentedCerealizer:
+    """
+    Times the calls to a cerealizer, and passes every other attribute through to it.
+    """
+    __slots__ = ('cerealizer', 'instrumentation')
+
+    def __init__(self, cerealizer: Cerealizer, instrumentation: Instrumentation) -> None:
+        object.__setattr__(self, 'cerealizer', cerealizer)
+        object.__setattr__(self, 'instrumentation', instrumentation)
+
+    def __getattr__(self, item: str) -> any:
+        return getattr(self.cerealizer, item)
+
+    def __setattr__(self, key: str, value: any) -> None:
+        setattr(self.cerealizer, key, value)
+
+    def serialize(self, obj: any, t: T = None) -> V:
+        start = time.perf_counter()
+        try:
+            return self.cerealizer.serialize(obj, t)
+        finally:
+            self.instrumentation.record(Event(SERIALIZE, type(obj) if t is None else t, 1,
+                                              time.perf_counter() - start, 0))
+
+    def deserialize(self, obj: V, t: T) -> T:
+        start = time.perf_counter()
+        try:
+            return self.cerealizer.deserialize(obj, t)
+        finally:
+            self.instrumentation.record(Event(DESERIALIZE, t, 1, time.perf_counter() - start, 0))
+
+
+def type_name(t: any) -> str:
+    if isinstance(t, type):
+        return f'{t.__module__}.{t.__qualname__}'
+    return repr(t)
@@ -0,0 +1,85 @@
+import sys
+import threading
+import typing
+
+from super_cereal.cerealizer import CacheInfo
+from super_cereal.cerealizer.builtins import PassthruCerealizer
+
+
+class InternTable:
+    """
+    Hands out one shared instance per distinct value, so values repeated across many deserialized records, like
+    country codes or status strings, are only held once. Used through `JsonCerealizer(intern_table=...)`.
+
+    Strings up to `max_length` characters are interned, and with `frozen_dataclasses` also equal instances of frozen
+    dataclasses. Once the table holds `max_size` values, new ones are returned as is rather than added. With
+    `per_batch`, the values are dropped after every `deserialize_batch`, so they are only held while a batch is built.
+    """
+
+    def __init__(self, max_size: int = 100_000, max_length: int = 64, frozen_dataclasses: bool = False,
+                 per_batch: bool = False) -> None:
+        self.max_size = max_size
+        self.max_length = max_length
+        self.frozen_dataclasses = frozen_dataclasses
+        self.per_batch = per_batch
+        self.values: typing.Dict[any, any] = {}
+        self.hits = 0
+        self.misses = 0
+        #: The approximate size of the duplicates that were replaced. Only the objects themselves are counted, not
+        #: the values they hold.
+        self.saved_bytes = 0
+        self._lock = threading.Lock()
+
+    def intern(self, value: any) -> any:
+        """
+        Returns the instance in the table equal to `value`, adding `value` if there is none and the table has room.
+        Unhashable values, e.g. frozen dataclasses holding a list, are returned as is.
+        """
+        try:
+            interned = self.values.get(value)
+        except TypeError:
+            return value
+
+        with self._lock:
+            if interned is None:
+                self.misses += 1
+                if len(self.values) < self.max_size:
+                    self.values[value] = value
+                return value
+
+            self.hits += 1
+            if interned is not value:
+                self.saved_bytes += _size(value)
+        return interned
+
+    def intern_str(self, value: str) -> str:
+        return self.intern(value) if len(value) <= self.max_length else value
+
+    def cache_info(self) -> CacheInfo:
+        return CacheInfo(self.hits, self.misses, len(self.values))
+
+    def clear(self) -> None:
+        """
+        Drops the interned values. The counters and `saved_bytes` are kept.
+        """
+        self.values.clear()
+
+
+class InterningCerealizer(PassthruCerealizer):
+    """
+    A `PassthruCerealizer` for `str` that deserializes through an `InternTable`.
+    """
+
+    def __init__(self, table: InternTable) -> None:
+        super().__init__()
+        self.table = table
+
+    def deserialize(self, obj: any, t: any) -> any:
+        return None if obj is None else self.table.intern_str(t(obj))
+
+
+def _size(value: any) -> int:
+    size = sys.getsizeof(value)
+    if hasattr(value, '__dict__'):
+        size += sys.getsizeof(value.__dict__)
+    return size
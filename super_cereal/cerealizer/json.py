@@ -1,62 +1,211 @@
-import json
+import concurrent.futures
+import contextlib
 import typing
 from enum import EnumMeta
 
 from super_cereal.cerealizer import Cerealizer, T, TheTypeRegistry
 from super_cereal.cerealizer.builtins import PassthruCerealizer, ListCerealizer, UnionCerealizer, DictCerealizer, \
     EnumCerealizer
-from super_cereal.cerealizer.encryption import EncryptedCerealizer, Encrypted
+from super_cereal.cerealizer.codec import JsonCodec, StdlibJsonCodec
+from super_cereal.cerealizer.compiled import CompiledDictCerealizer
+from super_cereal.cerealizer.encryption import EncryptedCerealizer, Encrypted, EncryptionBatch
+from super_cereal.cerealizer.instrumentation import Event, SERIALIZE, DESERIALIZE
+from super_cereal.cerealizer.interning import InternTable, InterningCerealizer
+from super_cereal.cerealizer.lazy import LazyDictCerealizer
+from super_cereal.cerealizer.positional import PositionalDictCerealizer
+from super_cereal.cerealizer.projection import project, parse_fields
 
 JsonTypes = typing.Union[str, float, int, bool, type(None), list, dict]
 
 
 class JsonCerealizer(Cerealizer[T, JsonTypes]):
-    def __init__(self, encryption_keys: typing.Dict[str, bytes] = None):
+    def __init__(self, encryption_keys: typing.Dict[str, bytes] = None, compiled: bool = False,
+                 codec: JsonCodec = None, numeric_arrays: bool = False, compact_encryption: bool = False,
+                 lazy_decryption: bool = False, lazy: bool = False, positional: bool = False,
+                 intern_table: InternTable = None):
+        """
+        :param compiled: generate a serialize/deserialize function per type instead of walking its fields on every
+            call. See `CompiledDictCerealizer`.
+        :param codec: encodes JSON to bytes, for `Encrypted` values and `JsonByteCerealizer`. Defaults to
+            `StdlibJsonCodec`.
+        :param numeric_arrays: deserialize lists of floats and ints into `array.array`. See `ListCerealizer`.
+        :param compact_encryption: serialize `Encrypted` values as a single base64 envelope instead of a dict. See
+            `EncryptedCerealizer`.
+        :param lazy_decryption: deserialize `Encrypted` values to `LazyEncrypted`, which only decrypts when its value
+            is read.
+        :param lazy: only convert nested objects and lists when they are first read. See `LazyDictCerealizer`.
+        :param positional: write objects as arrays of their fields in `__init__` order rather than as dicts. See
+            `PositionalDictCerealizer`.
+        :param intern_table: share repeated strings, and with its `frozen_dataclasses` also equal frozen dataclasses,
+            between deserialized objects. See `InternTable`.
+
+        Only one of `compiled`, `lazy` and `positional` can be set, and sharing frozen dataclasses can't be combined
+        with `compiled` or `lazy`. Raises ValueError otherwise.
+        """
+        modes = [name for name, enabled in (('compiled', compiled), ('lazy', lazy), ('positional', positional))
+                 if enabled]
+        if len(modes) > 1:
+            raise ValueError(f'Only one of {", ".join(modes)} can be set.')
+        if intern_table is not None and intern_table.frozen_dataclasses and (compiled or lazy):
+            raise ValueError(f'Frozen dataclasses can\'t be interned with {modes[0]} set.')
+
+        self.codec = codec or StdlibJsonCodec()
+
         registry = TheTypeRegistry()
         registry[type(None)] = PassthruCerealizer()
-        registry[str] = PassthruCerealizer()
+        registry[str] = PassthruCerealizer() if intern_table is None else InterningCerealizer(intern_table)
         registry[float] = PassthruCerealizer()
         registry[int] = PassthruCerealizer()
         registry[bool] = PassthruCerealizer()
         registry[EnumMeta] = EnumCerealizer()
-        registry[list] = ListCerealizer()
-        registry[typing.List] = ListCerealizer()
+        registry[list] = ListCerealizer(numeric_arrays=numeric_arrays)
+        registry[typing.List] = ListCerealizer(numeric_arrays=numeric_arrays)
         registry[typing.Union] = UnionCerealizer()
 
         if EncryptedCerealizer.enabled():
-            registry[Encrypted] = EncryptedCerealizer(encryption_keys, self)
-
-        registry.default = DictCerealizer()
-
+            registry[Encrypted] = EncryptedCerealizer(encryption_keys, self, self.codec, compact_encryption,
+                                                          lazy_decryption)
+
+        if positional:
+            registry.default = PositionalDictCerealizer()
+        elif lazy:
+            registry.default = LazyDictCerealizer()
+        elif compiled:
+            registry.default = CompiledDictCerealizer()
+        else:
+            registry.default = DictCerealizer()
+        registry.default.intern_table = intern_table
+
+        self.intern_table = intern_table
         self.registry = registry
 
     def serialize(self, obj: any, expected_type: T = None) -> JsonTypes:
         if expected_type is None:
             expected_type = type(obj)
 
-        if expected_type in self.registry:
-            return self.registry[expected_type].serialize(obj, expected_type)
-        if typing.get_origin(expected_type) in self.registry:
-            return self.registry[typing.get_origin(expected_type)].serialize(obj, expected_type)
+        return self.registry[expected_type].serialize(obj, expected_type)
 
-        return self.registry.default.serialize(obj, expected_type)
-
-    def deserialize(self, obj: JsonTypes, t: T) -> T:
-        if t in self.registry:
+    def deserialize(self, obj: JsonTypes, t: T, fields: typing.Iterable[str] = None) -> T:
+        """
+        :param fields: only deserialize these fields, given as dotted paths like `address.city`. Returns a partial
+            object, without calling `__init__`, on which only the selected fields are set. See `project`.
+        """
+        if fields is None:
             return self.registry[t].deserialize(obj, t)
-        if typing.get_origin(t) in self.registry:
-            return self.registry[typing.get_origin(t)].deserialize(obj, t)
-
-        return self.registry.default.deserialize(obj, t)
+        return project(self.registry, obj, t, parse_fields(fields))
+
+    def serialize_batch(self, objs: typing.Iterable[any], expected_type: T = None,
+                        executor: concurrent.futures.Executor = None,
+                        max_workers: int = None) -> typing.List[JsonTypes]:
+        """
+        Serializes all of `objs`, running the encryption of their `Encrypted` fields on `executor`, or on a thread
+        pool of `max_workers` threads when no executor is given.
+        """
+        with self._encryption_batch(executor, max_workers) as batch:
+            serialized = [JsonCerealizer.serialize(self, obj, expected_type) for obj in objs]
+
+        return serialized if batch is None else batch.resolve(serialized)
+
+    def deserialize_batch(self, objs: typing.Iterable[JsonTypes], t: T, executor: concurrent.futures.Executor = None,
+                          max_workers: int = None) -> typing.List[T]:
+        """
+        Deserializes all of `objs`, running the decryption of their `Encrypted` fields like `serialize_batch` does.
+        With a `per_batch` intern table, the interned values are dropped afterwards.
+        """
+        try:
+            with self._encryption_batch(executor, max_workers):
+                deserialized = [JsonCerealizer.deserialize(self, obj, t) for obj in objs]
+        finally:
+            if self.intern_table is not None and self.intern_table.per_batch:
+                self.intern_table.clear()
+
+        return deserialized
+
+    @contextlib.contextmanager
+    def _encryption_batch(self, executor: typing.Optional[concurrent.futures.Executor],
+                          max_workers: typing.Optional[int]) -> typing.Iterator[typing.Optional[EncryptionBatch]]:
+        if Encrypted not in self.registry:
+            yield None
+        elif executor is not None:
+            with self.registry[Encrypted].batch(executor) as batch:
+                yield batch
+        else:
+            with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+                with self.registry[Encrypted].batch(executor) as batch:
+                    yield batch
 
 
 class JsonByteCerealizer(JsonCerealizer):
 
-    def __init__(self, encryption_keys: typing.Dict[str, bytes] = None):
-        super().__init__(encryption_keys)
+    def __init__(self, encryption_keys: typing.Dict[str, bytes] = None, compiled: bool = False,
+                 codec: JsonCodec = None, numeric_arrays: bool = False, compact_encryption: bool = False,
+                 lazy_decryption: bool = False, lazy: bool = False, positional: bool = False,
+                 intern_table: InternTable = None):
+        super().__init__(encryption_keys, compiled=compiled, codec=codec, numeric_arrays=numeric_arrays,
+                         compact_encryption=compact_encryption, lazy_decryption=lazy_decryption, lazy=lazy,
+                         positional=positional, intern_table=intern_table)
+
+        if Encrypted in self.registry:
+            # Encrypted values are JSON encoded by EncryptedCerealizer itself, so they need JsonCerealizer's output.
+            self.registry[Encrypted].value_cerealizer = super()
 
     def serialize(self, obj: any, expected_type: T = None) -> bytes:
-        return json.dumps(super().serialize(obj, expected_type)).encode()
+        serialized = self.codec.dumps(super().serialize(obj, expected_type))
+
+        instrumentation = self.registry.instrumentation
+        if instrumentation is not None:
+            t = type(obj) if expected_type is None else expected_type
+            instrumentation.record(Event(SERIALIZE, t, 0, 0.0, len(serialized)))
+
+        return serialized
+
+    def deserialize(self, obj: bytes, t: T, fields: typing.Iterable[str] = None) -> T:
+        instrumentation = self.registry.instrumentation
+        if instrumentation is not None:
+            instrumentation.record(Event(DESERIALIZE, t, 0, 0.0, len(obj)))
+
+        return super().deserialize(self.codec.loads(obj), t, fields)
+
+    def serialize_batch(self, objs: typing.Iterable[any], expected_type: T = None,
+                        executor: concurrent.futures.Executor = None, max_workers: int = None) -> typing.List[bytes]:
+        return [self.codec.dumps(obj) for obj in super().serialize_batch(objs, expected_type, executor, max_workers)]
+
+    def deserialize_batch(self, objs: typing.Iterable[bytes], t: T, executor: concurrent.futures.Executor = None,
+                          max_workers: int = None) -> typing.List[T]:
+        return super().deserialize_batch([self.codec.loads(obj) for obj in objs], t, executor, max_workers)
+
+    def dump_stream(self, objs: typing.Iterable[any], fileobj: typing.IO[bytes], expected_type: T = None,
+                    chunk_size: int = 1000) -> int:
+        """
+        Writes `objs` to `fileobj` as newline-delimited JSON, `chunk_size` records per write. Returns the number of
+        records written.
+        """
+        count = 0
+        chunk = []
+
+        for obj in objs:
+            chunk.append(self.serialize(obj, expected_type))
+            chunk.append(b'\n')
+            count += 1
+
+            if len(chunk) >= 2 * chunk_size:
+                fileobj.write(b''.join(chunk))
+                chunk.clear()
+
+        if chunk:
+            fileobj.write(b''.join(chunk))
+
+        return count
+
+    def load_stream(self, fileobj: typing.IO[bytes], t: T, fields: typing.Iterable[str] = None) -> typing.Iterator[T]:
+        """
+        Lazily yields one object per line of newline-delimited JSON read from `fileobj`. Blank lines are skipped.
+
+        :param fields: only deserialize these fields, like `deserialize`.
+        """
+        if fields is not None:
+            fields = list(fields)
 
-    def deserialize(self, obj: bytes, t: T) -> T:
-        return super().deserialize(json.loads(obj.decode()), t)
+        for line in fileobj:
+            if not line.isspace():
+                yield self.deserialize(line, t, fields)
@@ -0,0 +1,205 @@
+import dataclasses
+import inspect
+import typing
+import weakref
+
+from super_cereal.cerealizer import T, V
+from super_cereal.cerealizer.builtins import DictCerealizer, PassthruCerealizer, EnumCerealizer
+
+#: Holds the proxy class of a type, in the type's own namespace so the two are collected together.
+_PROXY = '__super_cereal_lazy__'
+#: Holds the type a proxy class stands in for.
+_PROXIED = '__super_cereal_proxied__'
+#: Holds the `(deferred fields, serialized dict)` of a lazily deserialized instance.
+_PENDING = '__super_cereal_pending__'
+
+Deferred = typing.Dict[str, typing.Tuple[any, DictCerealizer]]
+
+
+class LazyPlan(typing.NamedTuple):
+    #: Fields that are cheap to convert and are set as soon as the object is deserialized.
+    eager: typing.Tuple[typing.Tuple[str, any, DictCerealizer], ...]
+    #: Fields that are converted and set the first time they are read.
+    deferred: Deferred
+
+
+class LazyDictCerealizer(DictCerealizer):
+    """
+    A `DictCerealizer` that only converts primitive, enum and dict fields when deserializing. Every other field
+    (nested objects, lists, unions, `Encrypted` values) is converted the first time it is read and then kept on the
+    instance, so reading a few fields of a large message doesn't build the rest of it.
+
+    Objects are returned as instances of a subclass of the requested type that is created once per type. They compare
+    equal to eagerly built instances, and pickle and copy as the requested type. A missing or malformed field is only
+    reported when it is read. Serializing an object converts and serializes every field, like `DictCerealizer`, unless
+    `passthrough` is set.
+
+    Only dataclasses whose `__init__` does nothing but set their fields are proxied, since it is never called. Those
+    with a `__post_init__`, `init=False` fields or `__slots__` are deserialized eagerly, like any other type.
+    """
+
+    def __init__(self, encryption_keys: typing.Dict[str, bytes] = None, passthrough: bool = False):
+        """
+        :param passthrough: serialize the fields that haven't been read yet by writing them out exactly as they were
+            read, skipping their conversion. They are neither validated nor normalized, and share the objects of the
+            deserialized input, which must not be changed afterwards.
+        """
+        super().__init__(encryption_keys)
+        self.passthrough = passthrough
+        self.lazy_plans: typing.MutableMapping[type, typing.Optional[LazyPlan]] = weakref.WeakKeyDictionary()
+
+    def invalidate(self):
+        super().invalidate()
+        self.lazy_plans.clear()
+
+    def lazy_plan(self, t: type) -> typing.Optional[LazyPlan]:
+        """
+        Returns how `t` is split into eager and deferred fields, or None when it has to be deserialized eagerly.
+        """
+        try:
+            return self.lazy_plans[t]
+        except KeyError:
+            pass
+        except TypeError:
+            return None
+
+        plan = self.lazy_plans[t] = self._build_lazy_plan(t)
+        return plan
+
+    def _build_lazy_plan(self, t: type) -> typing.Optional[LazyPlan]:
+        plan = self.plan(t)
+        if plan.unannotated is not None or _proxy(t) is None:
+            return None
+
+        eager = []
+        deferred = {}
+        for field, annotation, cerealizer in plan.fields:
+            if type(cerealizer) in (PassthruCerealizer, EnumCerealizer) or \
+                    annotation == dict or typing.get_origin(annotation) == dict:
+                eager.append((field, annotation, cerealizer))
+            else:
+                deferred[field] = (annotation, cerealizer)
+
+        return LazyPlan(tuple(eager), deferred) if deferred else None
+
+    def serialize(self, obj: any, t: T = None) -> V:
+        t = _proxied(t)
+        pending = getattr(obj, '__dict__', {}).get(_PENDING) if self.passthrough else None
+        if pending is None or pending[0] is not getattr(self.lazy_plan(t), 'deferred', None):
+            return super().serialize(obj, t)
+
+        values = obj.__dict__
+        serialized = pending[1]
+        return {
+            field: cerealizer.serialize(values[field], annotation) if field in values else serialized[field]
+            for field, annotation, cerealizer in self.plan(t).fields
+        }
+
+    def deserialize(self, obj: V, t: T) -> T:
+        t = _proxied(t)
+        plan = self.lazy_plan(t)
+        if plan is None:
+            return super().deserialize(obj, t)
+
+        instance = object.__new__(t.__dict__[_PROXY])
+        values = instance.__dict__
+        for field, annotation, cerealizer in plan.eager:
+            values[field] = cerealizer.deserialize(obj[field], annotation)
+        values[_PENDING] = (plan.deferred, obj)
+        return instance
+
+
+class _DeferredField:
+    """
+    Converts a field on first read. Being a non-data descriptor, it isn't consulted again once the value is set.
+    """
+
+    def __init__(self, field: str) -> None:
+        self.field = field
+
+    def __get__(self, instance: any, owner: type = None) -> any:
+        if instance is None:
+            return self
+
+        values = instance.__dict__
+        try:
+            deferred, serialized = values[_PENDING]
+        except KeyError:
+            raise AttributeError(self.field) from None
+
+        annotation, cerealizer = deferred[self.field]
+        value = values[self.field] = cerealizer.deserialize(serialized[self.field], annotation)
+        return value
+
+
+def _proxied(t: type) -> type:
+    return getattr(t, '__dict__', {}).get(_PROXIED, t)
+
+
+def _proxy(t: type) -> typing.Optional[type]:
+    """
+    Returns the proxy class for `t`, creating it the first time, or None if `t` can't be proxied.
+    """
+    if not dataclasses.is_dataclass(t) or not isinstance(t, type):
+        return None
+
+    proxy = t.__dict__.get(_PROXY)
+    if proxy is not None:
+        return proxy
+
+    params = t.__dataclass_params__
+    if not params.init or hasattr(t, '__post_init__') or not all(field.init for field in dataclasses.fields(t)) \
+            or t.__dictoffset__ == 0 or t.__new__ is not object.__new__:
+        return None
+
+    namespace = {
+        '__module__': t.__module__,
+        '__qualname__': t.__qualname__,
+        '__reduce_ex__': _reduce_ex,
+        _PROXIED: t,
+    }
+
+    for field in _field_names(t):
+        namespace[field] = _DeferredField(field)
+
+    if params.eq:
+        namespace['__eq__'] = _dataclass_eq(t)
+        namespace['__hash__'] = t.__hash__
+
+    try:
+        proxy = type(t)(t.__name__, (t,), namespace)
+        setattr(t, _PROXY, proxy)
+    except (TypeError, AttributeError):
+        return None
+
+    return proxy
+
+
+def _field_names(t: type) -> typing.List[str]:
+    return list(inspect.signature(t.__init__).parameters)[1:]
+
+
+def _dataclass_eq(t: type) -> typing.Callable[[any, any], bool]:
+    fields = tuple(field.name for field in dataclasses.fields(t) if field.compare)
+
+    def __eq__(self, other):
+        if type(other) is not t and _proxied(type(other)) is not t:
+            return NotImplemented
+        return tuple(getattr(self, field) for field in fields) == tuple(getattr(other, field) for field in fields)
+
+    return __eq__
+
+
+def _reduce_ex(self, protocol: int) -> tuple:
+    # Copies and pickles are plain instances of the proxied type, with every field converted.
+    t = type(self).__dict__[_PROXIED]
+    state = {key: value for key, value in self.__dict__.items() if key != _PENDING}
+    for field in _field_names(t):
+        state[field] = getattr(self, field)
+    return _rebuild, (t, state)
+
+
+def _rebuild(t: type, state: typing.Dict[str, any]) -> any:
+    instance = object.__new__(t)
+    instance.__dict__.update(state)
+    return instance
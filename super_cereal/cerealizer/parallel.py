@@ -0,0 +1,91 @@
+import concurrent.futures
+import itertools
+import typing
+
+from super_cereal.cerealizer import ICerealizer, T
+
+#: The cerealizer of the current worker process, built once by `_initialize`.
+_cerealizer: typing.Optional[ICerealizer] = None
+
+
+class ParallelCerealizer:
+    """
+    Serializes and deserializes large batches of objects on a pool of worker processes, so the work isn't bound to
+    one core by the GIL. Each worker builds its own cerealizer once, by calling `factory(*args, **kwargs)`, so
+    encryption keys and caches are set up once per process rather than once per batch.
+
+    The factory, its arguments, the objects and their types all have to be picklable, which means the types must be
+    importable from a module. Records are handed to the workers `chunksize` at a time, and results come back in the
+    order of the input.
+
+    `AvroCerealizer` writes a whole object container per record, so use it with `single_object=True` here.
+    """
+
+    def __init__(self, factory: typing.Callable[..., ICerealizer], *args: any, max_workers: int = None,
+                 chunksize: int = 1000, **kwargs: any) -> None:
+        """
+        :param max_workers: how many worker processes to start. Defaults to the number of processors.
+        :param chunksize: how many records each worker task handles.
+        """
+        self.factory = factory
+        self.args = args
+        self.kwargs = kwargs
+        self.max_workers = max_workers
+        self.chunksize = chunksize
+        self._executor: typing.Optional[concurrent.futures.ProcessPoolExecutor] = None
+
+    @property
+    def executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        """
+        The worker pool, started on first use and kept until `close`.
+        """
+        if self._executor is None:
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                self.max_workers, initializer=_initialize, initargs=(self.factory, self.args, self.kwargs))
+        return self._executor
+
+    def serialize_many(self, objs: typing.Iterable[any], expected_type: T = None) -> typing.List[any]:
+        return self._map(_serialize_chunk, objs, expected_type)
+
+    def deserialize_many(self, objs: typing.Iterable[any], t: T) -> typing.List[T]:
+        return self._map(_deserialize_chunk, objs, t)
+
+    def _map(self, task: typing.Callable[[typing.List[any], T], typing.List[any]], objs: typing.Iterable[any],
+             t: T) -> typing.List[any]:
+        chunks = _chunks(objs, self.chunksize)
+        return list(itertools.chain.from_iterable(self.executor.map(task, chunks, itertools.repeat(t))))
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+    def __enter__(self) -> 'ParallelCerealizer':
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        self.close()
+
+
+def _chunks(objs: typing.Iterable[any], size: int) -> typing.Iterator[typing.List[any]]:
+    objs = iter(objs)
+    while True:
+        chunk = list(itertools.islice(objs, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _initialize(factory: typing.Callable[..., ICerealizer], args: tuple, kwargs: dict) -> None:
+    global _cerealizer
+    _cerealizer = factory(*args, **kwargs)
+
+
+def _serialize_chunk(objs: typing.List[any], t: T) -> typing.List[any]:
+    serialize = _cerealizer.serialize
+    return [serialize(obj, t) for obj in objs]
+
+
+def _deserialize_chunk(objs: typing.List[any], t: T) -> typing.List[any]:
+    deserialize = _cerealizer.deserialize
+    return [deserialize(obj, t) for obj in objs]
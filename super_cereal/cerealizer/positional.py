@@ -0,0 +1,76 @@
+import typing
+
+from super_cereal.cerealizer import T, V, SerializationException, DeserializationException
+from super_cereal.cerealizer.builtins import DictCerealizer, FieldPlan
+
+
+class PositionalDictCerealizer(DictCerealizer):
+    """
+    A `DictCerealizer` that writes each object as a JSON array of its fields in `__init__` order instead of a dict,
+    so field names aren't repeated in every record. It still reads the dict form, so data can be migrated.
+
+    Field order is the schema: reordering, adding or removing `__init__` parameters makes existing data unreadable,
+    which the optional `version` tag guards against.
+
+    Use it as the registry default (`JsonCerealizer(positional=True)`) or only for some types
+    (`cerealizer.registry[Message] = PositionalDictCerealizer()`).
+    """
+    serialized_types = (list, dict)
+
+    def __init__(self, encryption_keys: typing.Dict[str, bytes] = None, version: typing.Union[int, str] = None):
+        """
+        :param version: written as the first element of every array, and checked when reading one.
+        """
+        super().__init__(encryption_keys)
+        self.version = version
+
+    def serialize(self, obj: any, t: T = None) -> V:
+        if t == dict or typing.get_origin(t) == dict:
+            return obj
+
+        plan = self.plan(t)
+        if plan.unannotated is not None:
+            raise SerializationException(self._unannotated(t, plan))
+
+        serialized = [cerealizer.serialize(getattr(obj, field), annotation) for field, annotation, cerealizer in
+                      plan.fields]
+        if self.version is not None:
+            serialized.insert(0, self.version)
+        return serialized
+
+    def deserialize(self, obj: V, t: T) -> T:
+        if t == dict or typing.get_origin(t) == dict or type(obj) is dict:
+            return super().deserialize(obj, t)
+
+        plan = self.plan(t)
+        if plan.unannotated is not None:
+            raise DeserializationException(self._unannotated(t, plan))
+
+        return self._intern(t(**{
+            field: cerealizer.deserialize(obj[i], annotation)
+            for i, (field, annotation, cerealizer) in enumerate(plan.fields, self._start(obj, t, plan))
+        }), plan)
+
+    def field_values(self, obj: V, t: T) -> typing.Mapping[str, V]:
+        if type(obj) is dict:
+            return obj
+
+        plan = self.plan(t)
+        return {field: obj[i] for i, (field, _, _) in enumerate(plan.fields, self._start(obj, t, plan))}
+
+    def _start(self, obj: V, t: T, plan: FieldPlan) -> int:
+        """
+        Checks the version and length of the array `obj`, and returns the index of its first field.
+        """
+        start = 0
+        if self.version is not None:
+            if not obj or obj[0] != self.version:
+                version = obj[0] if obj else None
+                raise DeserializationException(
+                    f'"{t.__module__}.{t.__name__}" is version {self.version!r}, but version {version!r} was read.')
+            start = 1
+
+        if len(obj) - start != len(plan.fields):
+            raise DeserializationException(
+                f'"{t.__module__}.{t.__name__}" has {len(plan.fields)} fields, but {len(obj) - start} were read.')
+        return start
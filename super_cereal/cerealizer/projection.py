@@ -0,0 +1,83 @@
+import typing
+
+from super_cereal.cerealizer import ITypeRegistry, T, V, DeserializationException
+from super_cereal.cerealizer.encryption import Encrypted
+
+#: Selected field names, mapped to the fields selected within them, or to None when the whole field is selected.
+Projection = typing.Dict[str, typing.Optional['Projection']]
+
+
+def parse_fields(fields: typing.Iterable[str]) -> Projection:
+    """
+    Turns dotted field paths, e.g. `['name', 'address.city']`, into a `Projection`. Selecting a field whole takes
+    precedence over selecting fields within it.
+    """
+    projection: Projection = {}
+    for path in fields:
+        node = projection
+        *parents, leaf = path.split('.')
+        for name in parents:
+            if name in node and node[name] is None:
+                break
+            node = node.setdefault(name, {})
+        else:
+            node[leaf] = None
+    return projection
+
+
+def partial(t: type, values: typing.Iterable[typing.Tuple[str, any]]) -> any:
+    """
+    Creates a `t` without calling its `__init__`, with only the given fields set. Reading any other field raises
+    AttributeError.
+    """
+    instance = object.__new__(t)
+    for name, value in values:
+        object.__setattr__(instance, name, value)
+    return instance
+
+
+def annotations(registry: ITypeRegistry, t: type) -> typing.Dict[str, any]:
+    """
+    The field annotations of `t`, from the plan of the `DictCerealizer` that handles it.
+    """
+    plan = getattr(registry[t], 'plan', None)
+    if plan is None:
+        raise DeserializationException(f'Cannot select fields of {t}.')
+
+    field_plan = plan(t)
+    if field_plan.unannotated is not None:
+        raise DeserializationException(f'Cannot select fields of {t}: "{field_plan.unannotated}" has no annotation.')
+    return {name: annotation for name, annotation, _ in field_plan.fields}
+
+
+def project(registry: ITypeRegistry, obj: V, t: T, projection: typing.Optional[Projection]) -> T:
+    """
+    Deserializes only the selected fields of `obj`, through optionals and lists, into partial objects. The rest of
+    `obj` is not looked at, so unselected nested objects are never built and unselected `Encrypted` values never
+    decrypted.
+    """
+    if projection is None:
+        return registry[t].deserialize(obj, t)
+    if obj is None:
+        return None
+
+    origin = typing.get_origin(t)
+    if origin is typing.Union:
+        arms = [arm for arm in typing.get_args(t) if arm is not type(None)]
+        if len(arms) != 1:
+            raise DeserializationException(f'Cannot select fields of {t}, only of Optional types.')
+        return project(registry, obj, arms[0], projection)
+    if t == list or origin == list:
+        item = typing.get_args(t)[0]
+        return [project(registry, value, item, projection) for value in obj]
+    if origin == Encrypted:
+        raise DeserializationException(f'Cannot select fields within {t}.')
+
+    fields = annotations(registry, t)
+    unknown = projection.keys() - fields.keys()
+    if unknown:
+        raise DeserializationException(f'"{t.__module__}.{t.__name__}" has no field {", ".join(sorted(unknown))}.')
+
+    values = registry[t].field_values(obj, t)
+    return partial(t, ((name, project(registry, values[name], fields[name], selected))
+                       for name, selected in projection.items()))
@@ -0,0 +1,92 @@
+import asyncio
+import dataclasses
+import socket
+import threading
+from typing import List
+
+import pytest
+from Crypto.Random import get_random_bytes
+
+from super_cereal.cerealizer import DeserializationException
+from super_cereal.cerealizer.aio import AsyncCerealizer
+from super_cereal.cerealizer.avro import AvroCerealizer
+from super_cereal.cerealizer.encryption import Encrypted
+from super_cereal.cerealizer.json import JsonByteCerealizer
+
+
+class RecordingCerealizer(JsonByteCerealizer):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.threads = []
+
+    def serialize(self, obj, expected_type=None):
+        self.threads.append(threading.current_thread())
+        return super().serialize(obj, expected_type)
+
+
+def test_threshold():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: List[float]
+
+    cerealizer = RecordingCerealizer()
+    async_cerealizer = AsyncCerealizer(cerealizer, threshold=1000)
+    small, large = TestClass('small', []), TestClass('large', [1.5] * 1000)
+
+    async def run():
+        assert await async_cerealizer.adeserialize(await async_cerealizer.aserialize(small), TestClass) == small
+        assert await async_cerealizer.adeserialize(await async_cerealizer.aserialize(large), TestClass) == large
+        await async_cerealizer.aserialize(large)
+
+    asyncio.run(run())
+
+    main = threading.current_thread()
+    assert cerealizer.threads[:2] == [main, main]
+    assert cerealizer.threads[2] is not main
+
+
+@pytest.mark.parametrize('cerealizer_type', [JsonByteCerealizer, AvroCerealizer])
+def test_streams(cerealizer_type):
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: List[float]
+        field3: Encrypted[str]
+
+    async_cerealizer = AsyncCerealizer(cerealizer_type({'the_key': get_random_bytes(16)}), threshold=100)
+    objs = [TestClass(f'message {i}', [float(i)] * i, Encrypted('the_key', f'secret {i}')) for i in range(20)]
+
+    async def produce():
+        for obj in objs:
+            yield obj
+
+    async def run():
+        left, right = socket.socketpair()
+        _, writer = await asyncio.open_connection(sock=left)
+        reader, _ = await asyncio.open_connection(sock=right)
+
+        assert await async_cerealizer.write_stream(writer, produce(), TestClass) == len(objs)
+        writer.close()
+        await writer.wait_closed()
+
+        return [obj async for obj in async_cerealizer.read_stream(reader, TestClass)]
+
+    assert asyncio.run(run()) == objs
+
+
+def test_truncated_stream():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+
+    async_cerealizer = AsyncCerealizer(AvroCerealizer())
+
+    async def run():
+        reader = asyncio.StreamReader()
+        reader.feed_data(b'\x00\x00\x01\x00abc')
+        reader.feed_eof()
+        return [obj async for obj in async_cerealizer.read_stream(reader, TestClass)]
+
+    with pytest.raises(DeserializationException):
+        asyncio.run(run())
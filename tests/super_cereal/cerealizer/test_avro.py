@@ -1,11 +1,20 @@
+import array
 import dataclasses
+import gc
+import io
+import json
 from enum import Enum
-from typing import Optional, List
+from typing import Optional, List, Union
 
+import avro.schema
 import pytest
+from avro.datafile import DataFileReader, DataFileWriter
+from avro.errors import UnsupportedCodec
+from avro.io import DatumReader, DatumWriter, BinaryEncoder
 from Crypto.Random import get_random_bytes
 
-from super_cereal.cerealizer.avro import AvroCerealizer
+from super_cereal.cerealizer import CacheInfo, SerializationException, DeserializationException
+from super_cereal.cerealizer.avro import AvroCerealizer, schema_fingerprint
 from super_cereal.cerealizer.encryption import Encrypted
 
 
@@ -117,3 +126,506 @@ def test_encrypted_obj():
     serialized = cerealizer.serialize(obj)
     deserialized = cerealizer.deserialize(serialized, TestClass)
     assert obj == deserialized
+
+
+def test_schema_cache():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: int
+
+    cerealizer = AvroCerealizer()
+    cerealizer.schemas.warm(TestClass)
+    assert TestClass in cerealizer.schemas
+    assert cerealizer.schemas[TestClass].json == AvroCerealizer.get_schema(TestClass)
+    assert cerealizer.schemas.cache_info() == CacheInfo(hits=1, misses=1, size=1)
+
+    for i in range(3):
+        serialized = cerealizer.serialize(TestClass('stuff', i))
+        assert cerealizer.deserialize(serialized, TestClass) == TestClass('stuff', i)
+
+    info = cerealizer.schemas.cache_info()
+    assert info.misses == 1
+    assert info.size == 1
+    assert info.hits >= 4
+    assert info.hit_ratio == info.hits / (info.hits + 1)
+
+    # The writer schema in the container headers is only parsed once.
+    assert len(cerealizer.schemas.written) == 1
+    (raw, written), = cerealizer.schemas.written.items()
+    assert written[1] == cerealizer.schemas[TestClass].fingerprint
+    assert cerealizer.schemas.parse_written(raw) is written
+
+    cerealizer.schemas.clear()
+    assert cerealizer.schemas.cache_info() == CacheInfo(hits=0, misses=0, size=0)
+    assert cerealizer.schemas.written == {}
+
+
+@pytest.mark.parametrize('codec', ['null', 'deflate'])
+@pytest.mark.parametrize('block_size', [None, 7])
+def test_serialize_many(codec: str, block_size: Optional[int]):
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: int
+
+    cerealizer = AvroCerealizer()
+    objs = [TestClass('stuff', i) for i in range(100)]
+
+    serialized = cerealizer.serialize_many(objs, TestClass, codec=codec, block_size=block_size)
+    assert len(serialized) < sum(len(cerealizer.serialize(obj)) for obj in objs) / 10
+
+    with DataFileReader(io.BytesIO(serialized), DatumReader()) as reader:
+        assert reader.codec == codec
+        assert [cerealizer.json_serializer.deserialize(msg, TestClass) for msg in reader] == objs
+
+
+def test_writer():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+
+    cerealizer = AvroCerealizer()
+
+    with io.BytesIO() as bytes_io:
+        with cerealizer.writer(bytes_io, TestClass, sync_interval=1) as writer:
+            writer.append(TestClass('one'))
+            writer.extend([TestClass('two'), TestClass('three')])
+            assert writer.count == 3
+
+        assert not bytes_io.closed
+        assert cerealizer.deserialize(bytes_io.getvalue(), TestClass) == TestClass('one')
+
+    with pytest.raises(UnsupportedCodec):
+        cerealizer.writer(io.BytesIO(), TestClass, codec='bogus')
+
+
+@pytest.mark.parametrize('obj', ['stuff', 42, 12.552, True], ids=[str, int, float, bool])
+def test_single_object_primatives(obj: any):
+    cerealizer = AvroCerealizer(single_object=True)
+    serialized = cerealizer.serialize(obj)
+    assert serialized[:2] == b'\xc3\x01'
+    assert AvroCerealizer(single_object=True).deserialize(serialized, type(obj)) == obj
+
+
+def test_single_object():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: List[int]
+        field3: Optional[str]
+
+    cerealizer = AvroCerealizer(single_object=True)
+    obj = TestClass('stuff', [1, 2, 3], None)
+
+    serialized = cerealizer.serialize(obj)
+    assert serialized[2:10] == schema_fingerprint(cerealizer.schemas[TestClass].parsed)
+    assert len(serialized) == 10 + 1 + 5 + 1 + 3 + 1 + 1
+    assert cerealizer.deserialize(serialized, TestClass) == obj
+
+
+def test_schema_fingerprint():
+    assert schema_fingerprint(avro.schema.parse('"null"')).hex() == '8a8f25cce724dd63'
+    schema = avro.schema.parse('{"type": "record", "name": "X", "fields": [{"name": "a", "type": "int"}]}')
+    assert schema_fingerprint(schema).hex() == '347ba72582c3cc0c'
+
+
+def test_single_object_unknown_fingerprint():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+
+    @dataclasses.dataclass
+    class AnotherClass:
+        field1: int
+
+    serialized = AvroCerealizer(single_object=True).serialize(TestClass('stuff'))
+
+    with pytest.raises(DeserializationException, match='Unknown schema fingerprint'):
+        AvroCerealizer(single_object=True).deserialize(serialized, AnotherClass)
+
+    with pytest.raises(DeserializationException, match='Not Avro single-object encoded.'):
+        AvroCerealizer(single_object=True).deserialize(b'bogus', TestClass)
+
+
+def test_readers_do_not_leak_classes():
+    @dataclasses.dataclass
+    class Inner:
+        field: int
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: List[Inner]
+
+    cerealizer = AvroCerealizer()
+    serialized = cerealizer.serialize(TestClass('stuff', [Inner(1)]))
+    assert cerealizer.deserialize(serialized, TestClass) == TestClass('stuff', [Inner(1)])
+    assert cerealizer.deserialize(serialized, TestClass, fields=['field2.field']).field2[0].field == 1
+    assert len(cerealizer._readers) == 1
+
+    del TestClass, Inner
+    gc.collect()
+    assert len(cerealizer._readers) == 0
+    assert len(cerealizer._writers) == 0
+
+
+def test_direct_encoding_matches_datum_writer():
+    class Color(Enum):
+        RED = 1
+        GREEN = 2
+
+    @dataclasses.dataclass
+    class AnotherClass:
+        field: int
+        color: Color
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: List[AnotherClass]
+        field3: Optional[List[float]]
+        field4: Optional[AnotherClass]
+        field5: bool
+
+    obj = TestClass('stuff', [AnotherClass(1, Color.RED), AnotherClass(2, Color.GREEN)], [1.5, 2.5], None, True)
+
+    cerealizer = AvroCerealizer(single_object=True)
+    serialized = cerealizer.serialize(obj)
+
+    with io.BytesIO() as bytes_io:
+        DatumWriter(cerealizer.schemas[TestClass].parsed).write(
+            cerealizer.json_serializer.serialize(obj), BinaryEncoder(bytes_io))
+        assert serialized[10:] == bytes_io.getvalue()
+
+    assert cerealizer.deserialize(serialized, TestClass) == obj
+
+    obj.field4 = AnotherClass(3, Color.GREEN)
+    assert cerealizer.deserialize(cerealizer.serialize(obj), TestClass) == obj
+
+
+def test_direct_encoding_validates():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: int
+
+    cerealizer = AvroCerealizer()
+
+    # noinspection PyTypeChecker
+    assert cerealizer.deserialize(cerealizer.serialize(TestClass(42, 42)), TestClass) == TestClass('42', 42)
+
+    with pytest.raises(SerializationException):
+        # noinspection PyTypeChecker
+        cerealizer.serialize(TestClass(None, 42))
+
+    with pytest.raises(SerializationException):
+        cerealizer.serialize(TestClass('stuff', 1 << 40))
+
+
+def test_union_subclass():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: Optional[int]
+        field2: Union[str, float]
+
+    cerealizer = AvroCerealizer()
+
+    # noinspection PyTypeChecker
+    serialized = cerealizer.serialize(TestClass(True, 1.5))
+    assert cerealizer.deserialize(serialized, TestClass) == TestClass(1, 1.5)
+    assert type(cerealizer.deserialize(serialized, TestClass).field1) == int
+
+    with pytest.raises(NotImplementedError):
+        # noinspection PyTypeChecker
+        cerealizer.serialize(TestClass(1, 2))
+
+
+def test_union_numeric_array():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: Optional[List[float]]
+
+    cerealizer = AvroCerealizer()
+
+    # noinspection PyTypeChecker
+    serialized = cerealizer.serialize(TestClass(array.array('d', [1.5, 2.5])))
+    assert cerealizer.deserialize(serialized, TestClass) == TestClass([1.5, 2.5])
+
+    @dataclasses.dataclass
+    class BrotherClass:
+        name: str
+
+    @dataclasses.dataclass
+    class SisterClass:
+        name: str
+
+    cerealizer = AvroCerealizer()
+
+    serialized = cerealizer.serialize(BrotherClass('Bryce'))
+    assert cerealizer.deserialize(serialized, SisterClass) == SisterClass('Bryce')
+
+
+class NonSeekable(io.RawIOBase):
+    def __init__(self, data: bytes) -> None:
+        self.data = io.BytesIO(data)
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: int = -1) -> bytes:
+        return self.data.read(size)
+
+
+@pytest.mark.parametrize('codec', ['null', 'deflate', 'bzip2'])
+def test_deserialize_stream(codec: str):
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: int
+
+    cerealizer = AvroCerealizer()
+    objs = [TestClass('stuff', i) for i in range(100)]
+    serialized = cerealizer.serialize_many(objs, TestClass, codec=codec, block_size=10)
+
+    fileobj = NonSeekable(serialized)
+    stream = cerealizer.deserialize_stream(fileobj, TestClass)
+    assert next(stream) == objs[0]
+    assert fileobj.data.tell() < len(serialized) / 2
+
+    assert [objs[0]] + list(stream) == objs
+    assert not fileobj.closed
+
+    assert cerealizer.deserialize(serialized, TestClass) == objs[0]
+
+
+def test_deserialize_stream_empty():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+
+    cerealizer = AvroCerealizer()
+    serialized = cerealizer.serialize_many([], TestClass)
+
+    assert list(cerealizer.deserialize_stream(io.BytesIO(serialized), TestClass)) == []
+    assert cerealizer.deserialize(serialized, TestClass) is None
+
+
+def test_deserialize_stream_corrupt():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+
+    cerealizer = AvroCerealizer()
+    serialized = cerealizer.serialize_many([TestClass('stuff')], TestClass)
+
+    with pytest.raises(DeserializationException, match='sync marker'):
+        list(cerealizer.deserialize_stream(io.BytesIO(serialized[:-1] + b'\x00'), TestClass))
+
+    with pytest.raises(DeserializationException, match='truncated'):
+        list(cerealizer.deserialize_stream(io.BytesIO(serialized[:-20]), TestClass))
+
+    # Cut off within the varint holding the next block's record count.
+    header = cerealizer.serialize_many([], TestClass)
+    with pytest.raises(DeserializationException, match='truncated'):
+        list(cerealizer.deserialize_stream(io.BytesIO(header + b'\x80'), TestClass))
+
+
+class Shade(Enum):
+    RED = 1
+    GREEN = 2
+
+
+@dataclasses.dataclass
+class Address:
+    street: str
+    number: int
+
+
+@dataclasses.dataclass
+class PersonV1:
+    name: str
+    age: int
+    color: Shade
+    address: Optional[Address]
+    removed: List[int]
+
+
+@dataclasses.dataclass
+class NewAddress:
+    street: str
+    city: str = 'Chicago'
+
+
+# Union arms are matched to the written records by name.
+NewAddress.__name__ = 'Address'
+
+
+@dataclasses.dataclass
+class PersonV2:
+    color: Shade
+    name: str
+    age: float
+    address: Optional[NewAddress]
+    nickname: Optional[str] = None
+    tags: List[str] = dataclasses.field(default_factory=list)
+
+
+@pytest.mark.parametrize('single_object', [False, True])
+def test_schema_evolution(single_object: bool):
+    cerealizer = AvroCerealizer(single_object=single_object)
+    old = PersonV1('Bryce', 42, Shade.GREEN, Address('Main', 1), [1, 2, 3])
+
+    deserialized = cerealizer.deserialize(cerealizer.serialize(old), PersonV2)
+    assert deserialized == PersonV2(Shade.GREEN, 'Bryce', 42.0, NewAddress('Main'))
+    assert isinstance(deserialized.age, float)
+
+    new = PersonV2(Shade.RED, 'Bryce', 42.5, None, 'B', ['a'])
+    assert cerealizer.deserialize(cerealizer.serialize(new), PersonV2) == new
+    assert len(cerealizer._readers[PersonV2]) == 2
+
+
+@pytest.mark.parametrize('written_type, written, t, expected', [
+    ('int', 3, float, 3.0),
+    ('long', 1 << 40, float, float(1 << 40)),
+    ('float', 1.5, float, 1.5),
+    ('string', 'héllo', bytes, 'héllo'.encode()),
+    ('bytes', 'héllo'.encode(), str, 'héllo'),
+    ('long', 1, int, None),
+    ('double', 3.7, int, None),
+    ('string', '5', int, None),
+    ('bytes', b'hello', float, None),
+    ('boolean', True, int, None),
+])
+def test_schema_evolution_promotions(written_type: str, written: any, t: type, expected: any):
+    @dataclasses.dataclass
+    class TestClass:
+        value: t
+
+    schema = avro.schema.parse(json.dumps(
+        {'type': 'record', 'name': 'TestClass', 'fields': [{'name': 'value', 'type': written_type}]}))
+    with io.BytesIO() as bytes_io:
+        writer = DataFileWriter(bytes_io, DatumWriter(), schema)
+        writer.append({'value': written})
+        writer.flush()
+        serialized = bytes_io.getvalue()
+
+    cerealizer = AvroCerealizer()
+    if expected is None:
+        with pytest.raises(DeserializationException, match=f'Cannot read a written "{written_type}"'):
+            cerealizer.deserialize(serialized, TestClass)
+    else:
+        deserialized = cerealizer.deserialize(serialized, TestClass)
+        assert deserialized.value == expected
+        assert type(deserialized.value) is t
+
+
+def test_schema_evolution_union_promotion():
+    @dataclasses.dataclass
+    class Written:
+        value: int
+
+    @dataclasses.dataclass
+    class Read:
+        value: Union[str, float, None]
+
+    cerealizer = AvroCerealizer()
+    assert cerealizer.deserialize(cerealizer.serialize(Written(3)), Read) == Read(3.0)
+
+
+def test_schema_evolution_union_null():
+    @dataclasses.dataclass
+    class Written:
+        value: Optional[int]
+
+    @dataclasses.dataclass
+    class Read:
+        value: int
+
+    cerealizer = AvroCerealizer()
+    assert cerealizer.deserialize(cerealizer.serialize(Written(3)), Read) == Read(3)
+
+    # Only the null branch is an error, and only once it's read.
+    with pytest.raises(DeserializationException, match='Cannot read a written "null"'):
+        cerealizer.deserialize(cerealizer.serialize(Written(None)), Read)
+
+
+def test_schema_evolution_missing_default():
+    @dataclasses.dataclass
+    class Required:
+        name: str
+        required: int
+
+    cerealizer = AvroCerealizer()
+
+    with pytest.raises(DeserializationException, match='"required" is not in the written data and has no default'):
+        cerealizer.deserialize(cerealizer.serialize(PersonV1('Bryce', 42, Shade.RED, None, [])), Required)
+
+
+@pytest.mark.parametrize('single_object', [False, True])
+def test_projection(single_object: bool):
+    cerealizer = AvroCerealizer({'the_key': get_random_bytes(16)}, single_object=single_object)
+    old = PersonV1('Bryce', 42, Shade.GREEN, Address('Main', 1), [1, 2, 3])
+    serialized = cerealizer.serialize(old)
+
+    projected = cerealizer.deserialize(serialized, PersonV1, fields=['removed', 'address.number'])
+    assert projected.removed == [1, 2, 3]
+    assert projected.address.number == 1
+    with pytest.raises(AttributeError):
+        _ = projected.name
+
+    # Resolved against another reader type, too.
+    assert cerealizer.deserialize(serialized, PersonV2, fields=['age']).age == 42.0
+
+    with pytest.raises(DeserializationException, match='is not in the written data'):
+        cerealizer.deserialize(serialized, PersonV2, fields=['nickname'])
+
+
+@pytest.mark.parametrize('codec', ['null', 'deflate', 'bzip2'])
+def test_open(tmp_path, codec: str):
+    cerealizer = AvroCerealizer()
+    objs = [Address(f'street {i}', i) for i in range(100)]
+
+    path = tmp_path / 'addresses.avro'
+    with open(path, 'wb') as f:
+        with cerealizer.writer(f, Address, codec, block_size=7) as writer:
+            writer.extend(objs)
+
+    index_path = tmp_path / 'addresses.avro.index'
+    with cerealizer.open(path, Address, index_path) as avro_file:
+        assert len(avro_file) == 100
+        assert len(avro_file.blocks) == 15
+        assert avro_file[42] == objs[42]
+        assert avro_file[-1] == objs[-1]
+        assert avro_file[5:20:3] == objs[5:20:3]
+        assert list(avro_file) == objs
+        with pytest.raises(IndexError):
+            _ = avro_file[100]
+
+    assert index_path.exists()
+    with cerealizer.open(path, Address, index_path, fields=['number']) as avro_file:
+        assert avro_file[99].number == 99
+
+    with open(path, 'ab') as f:
+        with cerealizer.writer(f, Address, codec) as writer:
+            writer.append(Address('appended', 100))
+    with pytest.raises(DeserializationException):
+        cerealizer.open(path, Address, index_path)
+
+
+def test_open_empty_and_truncated(tmp_path):
+    cerealizer = AvroCerealizer()
+
+    path = tmp_path / 'empty.avro'
+    path.write_bytes(b'')
+    with pytest.raises(DeserializationException):
+        cerealizer.open(path, Address)
+
+    path.write_bytes(cerealizer.serialize_many([], Address))
+    with cerealizer.open(path, Address) as avro_file:
+        assert len(avro_file) == 0
+        assert avro_file[:] == []
+
+    path.write_bytes(cerealizer.serialize_many([Address('Main', 1)], Address)[:-5])
+    with pytest.raises(DeserializationException, match='truncated'):
+        cerealizer.open(path, Address)
@@ -0,0 +1,57 @@
+import dataclasses
+import json
+from typing import Dict, List, Optional
+
+import pytest
+from Crypto.Random import get_random_bytes
+
+from super_cereal.cerealizer.codec import StdlibJsonCodec, OrjsonCodec, best_codec
+from super_cereal.cerealizer.encryption import Encrypted
+from super_cereal.cerealizer.json import JsonByteCerealizer
+
+requires_orjson = pytest.mark.skipif(not OrjsonCodec.enabled(), reason='orjson is not installed')
+
+
+@pytest.mark.parametrize('obj', ['stüff', 42, 12.552, True, None, [1, 'two'], {'key': [1.5]}])
+def test_stdlib_codec(obj: any):
+    codec = StdlibJsonCodec()
+    assert codec.dumps(obj) == json.dumps(obj).encode()
+    assert codec.loads(codec.dumps(obj)) == obj
+
+
+@requires_orjson
+def test_orjson_codec():
+    codec = OrjsonCodec()
+    assert codec.dumps({2: 'value'}) == b'{"2":"value"}'
+    assert codec.loads(memoryview(b'{"key": [1.5]}')) == {'key': [1.5]}
+
+
+@pytest.mark.parametrize('codec', [
+    pytest.param(StdlibJsonCodec(), id='stdlib'),
+    pytest.param(OrjsonCodec() if OrjsonCodec.enabled() else None, marks=requires_orjson, id='orjson'),
+])
+def test_json_byte_cerealizer_codec(codec):
+    @dataclasses.dataclass
+    class Secret:
+        secret: str
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: Optional[List[float]]
+        field3: Dict[int, Dict[str, float]]
+        field4: Encrypted[Secret]
+
+    cerealizer = JsonByteCerealizer({'the_key': get_random_bytes(16)}, codec=codec)
+    obj = TestClass('stüff', [1.5, 2.0], {2: {'value': 222.55}}, Encrypted('the_key', Secret('the secret')))
+
+    serialized = cerealizer.serialize(obj)
+    assert cerealizer.registry[Encrypted].codec is codec
+
+    # JSON turns the int keys into strings, which stay strings when read back into a Dict.
+    obj.field3 = {'2': {'value': 222.55}}
+    assert cerealizer.deserialize(serialized, TestClass) == obj
+
+
+def test_best_codec():
+    assert isinstance(best_codec(), OrjsonCodec if OrjsonCodec.enabled() else StdlibJsonCodec)
@@ -0,0 +1,155 @@
+import dataclasses
+import gc
+from enum import Enum
+from typing import Optional, List, Dict
+
+import pytest
+from Crypto.Random import get_random_bytes
+
+from super_cereal.cerealizer import SerializationException, DeserializationException
+from super_cereal.cerealizer.compiled import CompiledDictCerealizer
+from super_cereal.cerealizer.encryption import Encrypted
+from super_cereal.cerealizer.json import JsonCerealizer
+
+
+def test_matches_json_cerealizer():
+    class Color(Enum):
+        RED = 1
+        GREEN = 2
+        BLUE = 3
+
+    @dataclasses.dataclass
+    class AnotherClass:
+        field: int
+        color: Color
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: Optional[List[AnotherClass]]
+        field3: Optional[List[AnotherClass]]
+        field4: Dict[int, Dict[str, float]]
+        field5: Color
+        field6: List[List[float]]
+        field7: AnotherClass
+        field8: Optional[str]
+        field9: Optional[str]
+
+    obj = TestClass(
+        'stuff',
+        [AnotherClass(42, Color.RED), AnotherClass(27, Color.GREEN)],
+        None,
+        {2: {'value': 222.55}},
+        Color.BLUE,
+        [[1.5, 2.5], []],
+        AnotherClass(1, Color.BLUE),
+        'another',
+        None
+    )
+
+    cerealizer = JsonCerealizer(compiled=True)
+    serialized = cerealizer.serialize(obj)
+    assert serialized == JsonCerealizer().serialize(obj)
+    assert cerealizer.deserialize(serialized, TestClass) == obj
+
+    assert isinstance(cerealizer.registry.default, CompiledDictCerealizer)
+    assert TestClass in cerealizer.registry.default.compiled
+    assert AnotherClass in cerealizer.registry.default.compiled
+
+
+def test_compiled_per_type():
+    @dataclasses.dataclass
+    class AnotherClass:
+        field: int
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: List[AnotherClass]
+        field3: Optional[AnotherClass]
+
+    obj = TestClass('stuff', [AnotherClass(42), AnotherClass(27)], None)
+
+    cerealizer = JsonCerealizer()
+    cerealizer.registry[TestClass] = CompiledDictCerealizer()
+
+    serialized = cerealizer.serialize(obj)
+    assert serialized == JsonCerealizer().serialize(obj)
+    assert cerealizer.deserialize(serialized, TestClass) == obj
+
+
+def test_wrong_type():
+    @dataclasses.dataclass
+    class WrongClass:
+        field1: str
+
+    cerealizer = JsonCerealizer(compiled=True)
+    # noinspection PyTypeChecker
+    serialized = cerealizer.serialize(WrongClass(42))
+    assert serialized == {'field1': '42'}
+
+
+def test_missing_field():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: int
+        field2: str
+
+    cerealizer = JsonCerealizer(compiled=True)
+
+    with pytest.raises(KeyError):
+        cerealizer.deserialize({'field1': 1}, TestClass)
+
+
+def test_no_annotations():
+    class NoAnnotations:
+        def __init__(self, bogus):
+            pass
+
+    cerealizer = JsonCerealizer(compiled=True)
+    msg = '"tests.super_cereal.cerealizer.test_compiled.NoAnnotations": "bogus" has no annotation.'
+
+    with pytest.raises(SerializationException, match=msg):
+        cerealizer.serialize(NoAnnotations('something'))
+
+    with pytest.raises(DeserializationException, match=msg):
+        cerealizer.deserialize({'bogus': 'something'}, NoAnnotations)
+
+
+def test_encrypted():
+    @dataclasses.dataclass
+    class Secret:
+        secret: str
+
+    @dataclasses.dataclass
+    class SecretClass:
+        field1: str
+        field2: Encrypted[Secret]
+
+    obj = SecretClass('some_thing', Encrypted('the_key', Secret('the secret')))
+
+    cerealizer = JsonCerealizer({'the_key': get_random_bytes(16)}, compiled=True)
+    serialized = cerealizer.serialize(obj)
+    assert cerealizer.deserialize(serialized, SecretClass) == obj
+
+
+def test_compiled_does_not_leak_classes():
+    @dataclasses.dataclass
+    class Inner:
+        field: int
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: Inner
+
+    cerealizer = JsonCerealizer(compiled=True)
+    serialized = cerealizer.serialize(TestClass('stuff', Inner(1)))
+    assert cerealizer.deserialize(serialized, TestClass) == TestClass('stuff', Inner(1))
+    assert len(cerealizer.registry.default.compiled) == 2
+
+    del TestClass, Inner
+    # Inner is only released once TestClass's entry is gone, which takes a second collection.
+    gc.collect()
+    gc.collect()
+    assert len(cerealizer.registry.default.compiled) == 0
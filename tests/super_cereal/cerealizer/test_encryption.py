@@ -1,10 +1,17 @@
+import base64
+import copy
 import dataclasses
+import json
+import pickle
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
 
 import pytest
 from Crypto.Random import get_random_bytes
 
-from super_cereal.cerealizer.encryption import Encrypted
-from super_cereal.cerealizer.json import JsonCerealizer
+from super_cereal.cerealizer import SerializationException
+from super_cereal.cerealizer.encryption import Encrypted, LazyEncrypted
+from super_cereal.cerealizer.json import JsonCerealizer, JsonByteCerealizer
 
 
 @pytest.mark.parametrize('obj', ['stuff', 42, 12.552, True], ids=[str, int, float, bool])
@@ -131,6 +138,199 @@ def test_cannot_decrypt_object_due_to_bad_key():
         assert str(e) == 'MAC check failed'
 
 
+def test_key_rotated_in_place():
+    keys = {'the_key': get_random_bytes(16)}
+    cerealizer = JsonCerealizer(keys)
+    cerealizer.serialize(Encrypted('the_key', 'secret'))
+
+    keys['the_key'] = get_random_bytes(16)
+    serialized = cerealizer.serialize(Encrypted('the_key', 'secret'))
+    assert JsonCerealizer(dict(keys)).deserialize(serialized, Encrypted[str]).value == 'secret'
+
+
 def test_encryption_repr():
     assert str(Encrypted('key', 'this is super secret')) == 'Encrypted(***)'
     assert repr(Encrypted('key', 'this is super secret')) == 'Encrypted(key_id=key, value=***)'
+
+
+@pytest.mark.parametrize('cerealizer_type', [JsonCerealizer, JsonByteCerealizer])
+def test_batch(cerealizer_type):
+    @dataclasses.dataclass
+    class Secret:
+        secret: Encrypted[str]
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: Encrypted[Secret]
+        field3: Encrypted[int]
+        field4: List[Encrypted[str]]
+
+    objs = [
+        TestClass(
+            f'thing {i}',
+            Encrypted('the_key', Secret(Encrypted('the_key', f'secret {i}'))),
+            Encrypted('the_key', i),
+            [Encrypted('the_key', 'one'), Encrypted('the_key', 'two')]
+        )
+        for i in range(20)
+    ]
+
+    cerealizer = cerealizer_type({'the_key': get_random_bytes(16)})
+
+    serialized = cerealizer.serialize_batch(objs, TestClass, max_workers=4)
+    assert [cerealizer.deserialize(obj, TestClass) for obj in serialized] == objs
+
+    with ThreadPoolExecutor(2) as executor:
+        assert cerealizer.deserialize_batch(serialized, TestClass, executor=executor) == objs
+
+    serialized = [cerealizer.serialize(obj) for obj in objs]
+    assert cerealizer.deserialize_batch(serialized, TestClass) == objs
+
+
+def test_batch_bad_key():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: Encrypted[str]
+
+    cerealizer = JsonCerealizer({'the_key': get_random_bytes(16)})
+    serialized = cerealizer.serialize_batch([TestClass(Encrypted('the_key', 'secret'))])
+
+    cerealizer.registry[Encrypted].encryption_keys = {'the_key': get_random_bytes(16)}
+    with pytest.raises(ValueError, match='MAC check failed'):
+        cerealizer.deserialize_batch(serialized, TestClass)
+
+    cerealizer.registry[Encrypted].encryption_keys = {}
+    assert cerealizer.deserialize_batch(serialized, TestClass) == [TestClass(Encrypted('the_key', None))]
+
+
+def test_envelope():
+    @dataclasses.dataclass
+    class Secret:
+        secret: str
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: Encrypted[Secret]
+        field3: Optional[Encrypted[str]]
+
+    key = get_random_bytes(16)
+    obj = TestClass('some_thing', Encrypted('the_key', Secret('the secret')), Encrypted('the_key', 'password'))
+
+    cerealizer = JsonCerealizer({'the_key': key}, compact_encryption=True)
+    serialized = cerealizer.serialize(obj)
+    assert isinstance(serialized['field2'], str)
+    assert cerealizer.deserialize(serialized, TestClass) == obj
+
+    legacy = JsonCerealizer({'the_key': key})
+    legacy_serialized = legacy.serialize(obj)
+    assert len(json.dumps(serialized)) < len(json.dumps(legacy_serialized))
+    assert cerealizer.deserialize(legacy_serialized, TestClass) == obj
+    assert legacy.deserialize(serialized['field2'], Encrypted[Secret]) == obj.field2
+
+    blob = base64.b64decode(serialized['field3'])
+    assert blob[:8] == b'\x07the_key'
+    assert len(blob) == 8 + 16 + 16 + len(b'"password"')
+
+
+def test_envelope_batch():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: Encrypted[str]
+        field2: List[Encrypted[int]]
+
+    cerealizer = JsonByteCerealizer({'the_key': get_random_bytes(16)}, compact_encryption=True)
+    objs = [TestClass(Encrypted('the_key', f'secret {i}'), [Encrypted('the_key', i)]) for i in range(10)]
+
+    serialized = cerealizer.serialize_batch(objs, TestClass)
+    assert b'nonce' not in serialized[0]
+    assert cerealizer.deserialize_batch(serialized, TestClass) == objs
+
+
+def test_envelope_key_id_too_long():
+    cerealizer = JsonCerealizer({'k' * 256: get_random_bytes(16)}, compact_encryption=True)
+
+    with pytest.raises(SerializationException):
+        cerealizer.serialize(Encrypted('k' * 256, 'secret'))
+
+
+@pytest.mark.parametrize('compact', [False, True], ids=['dict', 'envelope'])
+def test_lazy(compact: bool):
+    @dataclasses.dataclass
+    class Secret:
+        secret: str
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: Encrypted[Secret]
+
+    key = get_random_bytes(16)
+    obj = TestClass('some_thing', Encrypted('the_key', Secret('the secret')))
+
+    cerealizer = JsonCerealizer({'the_key': key}, compact_encryption=compact, lazy_decryption=True)
+    serialized = cerealizer.serialize(obj)
+
+    deserialized = cerealizer.deserialize(serialized, TestClass)
+    assert isinstance(deserialized.field2, LazyEncrypted)
+    assert not deserialized.field2.decrypted
+    assert cerealizer.serialize(deserialized) == serialized
+
+    assert deserialized == obj
+    assert deserialized.field2.decrypted
+    assert deserialized.field2.value is deserialized.field2.value
+
+    deserialized.field2.value.secret = 'another secret'
+    reserialized = cerealizer.serialize(deserialized)
+    assert reserialized != serialized
+    assert cerealizer.deserialize(reserialized, TestClass).field2.value == Secret('another secret')
+
+
+def test_lazy_key_id_changed():
+    @dataclasses.dataclass
+    class TestClass:
+        field: Encrypted[str]
+
+    keys = {'the_key': get_random_bytes(16), 'new_key': get_random_bytes(16)}
+    cerealizer = JsonCerealizer(keys, lazy_decryption=True)
+    deserialized = cerealizer.deserialize(cerealizer.serialize(TestClass(Encrypted('the_key', 'secret'))), TestClass)
+
+    deserialized.field.key_id = 'new_key'
+    assert not deserialized.field.decrypted
+    reserialized = cerealizer.serialize(deserialized)
+    assert reserialized['field']['key_id'] == 'new_key'
+
+    cerealizer = JsonCerealizer({'new_key': keys['new_key']})
+    assert cerealizer.deserialize(reserialized, TestClass) == TestClass(Encrypted('new_key', 'secret'))
+
+
+# Module level, so it can be pickled.
+@dataclasses.dataclass
+class PicklableSecret:
+    secret: str
+
+
+def test_lazy_pickle_and_copy():
+    cerealizer = JsonCerealizer({'the_key': get_random_bytes(16)}, lazy_decryption=True)
+    serialized = cerealizer.serialize(Encrypted('the_key', PicklableSecret('the secret')))
+
+    for copied in (pickle.loads(pickle.dumps(cerealizer.deserialize(serialized, Encrypted[PicklableSecret]))),
+                   copy.deepcopy(cerealizer.deserialize(serialized, Encrypted[PicklableSecret])),
+                   copy.copy(cerealizer.deserialize(serialized, Encrypted[PicklableSecret]))):
+        assert type(copied) is Encrypted
+        assert copied == Encrypted('the_key', PicklableSecret('the secret'))
+
+    deserialized = cerealizer.deserialize(serialized, Encrypted[PicklableSecret])
+    assert copy.deepcopy(deserialized).value is not deserialized.value
+
+
+def test_lazy_bad_key():
+    cerealizer = JsonCerealizer({'the_key': get_random_bytes(16)}, lazy_decryption=True)
+    serialized = cerealizer.serialize(Encrypted('the_key', 'secret'))
+
+    cerealizer.registry[Encrypted].encryption_keys = {'the_key': get_random_bytes(16)}
+    deserialized = cerealizer.deserialize(serialized, Encrypted[str])
+
+    with pytest.raises(ValueError, match='MAC check failed'):
+        _ = deserialized.value
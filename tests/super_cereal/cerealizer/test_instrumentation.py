@@ -0,0 +1,92 @@
+import dataclasses
+from typing import List, Optional
+
+from Crypto.Random import get_random_bytes
+
+from super_cereal.cerealizer.avro import AvroCerealizer
+from super_cereal.cerealizer.encryption import Encrypted
+from super_cereal.cerealizer.instrumentation import Instrumentation, type_name
+from super_cereal.cerealizer.json import JsonByteCerealizer, JsonCerealizer
+
+
+def test_json():
+    @dataclasses.dataclass
+    class AnotherClass:
+        field: int
+
+    @dataclasses.dataclass
+    class Message:
+        field1: str
+        field2: List[AnotherClass]
+        field3: Optional[Encrypted[str]]
+
+    def make_obj() -> Message:
+        return Message('stuff', [AnotherClass(1), AnotherClass(2)], Encrypted('the_key', 'secret'))
+
+    events = []
+    instrumentation = Instrumentation(events.append)
+    cerealizer = JsonByteCerealizer({'the_key': get_random_bytes(16)})
+    serialized = cerealizer.serialize(make_obj())
+
+    cerealizer.registry.instrumentation = instrumentation
+    assert cerealizer.serialize(make_obj()) is not None
+    assert cerealizer.deserialize(serialized, Message) == make_obj()
+    cerealizer.registry[Encrypted].encryption_keys = {}
+
+    snapshot = instrumentation.snapshot()
+    message = snapshot['serialize'][type_name(Message)]
+    assert message['calls'] == 1
+    assert message['bytes'] == len(serialized)
+    assert message['seconds'] > 0
+    assert snapshot['serialize'][type_name(AnotherClass)]['calls'] == 2
+    assert snapshot['deserialize'][type_name(Message)] == {
+        'calls': 1, 'seconds': snapshot['deserialize'][type_name(Message)]['seconds'], 'bytes': len(serialized)
+    }
+    assert snapshot['deserialize'][type_name(AnotherClass)]['calls'] == 2
+    assert type_name(str) not in snapshot['serialize']
+    assert {event.type for event in events} >= {Message, AnotherClass, Encrypted[str]}
+
+    assert cerealizer.deserialize(serialized, Message).field3 == Encrypted('the_key', None)
+
+    cerealizer.registry.instrumentation = None
+    instrumentation.reset()
+    cerealizer.serialize(Message('stuff', [AnotherClass(1)], None))
+    assert instrumentation.snapshot() == {'serialize': {}, 'deserialize': {}}
+
+
+def test_batch():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: Encrypted[str]
+
+    obj = TestClass('stuff', Encrypted('the_key', 'secret'))
+
+    instrumentation = Instrumentation()
+    cerealizer = JsonCerealizer({'the_key': get_random_bytes(16)})
+    cerealizer.registry.instrumentation = instrumentation
+
+    serialized = cerealizer.serialize_batch([obj] * 3, TestClass)
+    assert cerealizer.deserialize_batch(serialized, TestClass) == [obj] * 3
+    assert instrumentation.snapshot()['serialize'][type_name(TestClass)]['calls'] == 3
+
+
+def test_avro():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: Optional[Encrypted[str]]
+
+    obj = TestClass('stuff', Encrypted('the_key', 'secret'))
+
+    instrumentation = Instrumentation()
+    cerealizer = AvroCerealizer({'the_key': get_random_bytes(16)})
+    cerealizer.instrumentation = instrumentation
+
+    serialized = cerealizer.serialize(obj)
+    assert cerealizer.deserialize(serialized, TestClass) == obj
+
+    snapshot = instrumentation.snapshot()
+    assert snapshot['serialize'][type_name(TestClass)]['bytes'] == len(serialized)
+    assert snapshot['deserialize'][type_name(TestClass)]['calls'] == 1
+    assert snapshot['serialize'][type_name(Encrypted[str])]['calls'] == 1
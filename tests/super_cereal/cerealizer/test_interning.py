@@ -0,0 +1,141 @@
+import dataclasses
+from typing import List, Optional
+
+import pytest
+
+from super_cereal.cerealizer.interning import InternTable, InterningCerealizer
+from super_cereal.cerealizer.json import JsonCerealizer, JsonByteCerealizer
+
+
+def test_strings():
+    @dataclasses.dataclass
+    class Country:
+        code: str
+        name: str
+
+    @dataclasses.dataclass
+    class TestClass:
+        status: str
+        country: Country
+        nickname: Optional[str]
+        aliases: List[str]
+
+    table = InternTable()
+    cerealizer = JsonByteCerealizer(intern_table=table)
+    assert isinstance(cerealizer.registry[str], InterningCerealizer)
+
+    first, second = cerealizer.deserialize_batch([b'{"status": "active", "country": {"code": "NL", "name": "x"}, '
+                                                  b'"nickname": null, "aliases": ["shared"]}'] * 2, TestClass)
+    assert first == second
+    assert first.status is second.status
+    assert first.aliases[0] is second.aliases[0]
+    assert first.country is not second.country
+
+    info = table.cache_info()
+    assert info.hits == 4
+    assert info.misses == 4
+    assert info.size == 4
+    assert table.saved_bytes > 0
+
+
+def test_frozen_dataclasses():
+    @dataclasses.dataclass(frozen=True)
+    class Country:
+        code: str
+
+    @dataclasses.dataclass(frozen=True)
+    class Tags:
+        values: List[str]
+
+    @dataclasses.dataclass
+    class TestClass:
+        name: str
+        country: Country
+        tags: Tags
+
+    for positional in (False, True):
+        cerealizer = JsonByteCerealizer(intern_table=InternTable(frozen_dataclasses=True), positional=positional)
+        serialized = [cerealizer.serialize(TestClass(f'customer {i}', Country('NL'), Tags(['vip']))) for i in range(3)]
+
+        first, second, third = cerealizer.deserialize_batch(serialized, TestClass)
+        assert first.country is second.country is third.country
+        # Unhashable, so not shared.
+        assert first.tags == second.tags
+        assert first.tags is not second.tags
+
+
+def test_frozen_dataclasses_conflicting_modes():
+    with pytest.raises(ValueError, match="Frozen dataclasses can't be interned with compiled set."):
+        JsonCerealizer(compiled=True, intern_table=InternTable(frozen_dataclasses=True))
+
+    with pytest.raises(ValueError, match="Frozen dataclasses can't be interned with lazy set."):
+        JsonByteCerealizer(lazy=True, intern_table=InternTable(frozen_dataclasses=True))
+
+
+def test_compiled():
+    @dataclasses.dataclass
+    class Country:
+        code: str
+
+    @dataclasses.dataclass
+    class TestClass:
+        status: str
+        country: Country
+        aliases: List[str]
+
+    cerealizer = JsonByteCerealizer(compiled=True, intern_table=InternTable())
+    first, second = cerealizer.deserialize_batch(
+        [b'{"status": "active", "country": {"code": "NL"}, "aliases": ["shared"]}'] * 2, TestClass)
+    assert first.status is second.status
+    assert first.country.code is second.country.code
+    assert first.aliases[0] is second.aliases[0]
+
+
+def test_limits():
+    table = InternTable(max_size=1, max_length=3)
+    cerealizer = JsonCerealizer(intern_table=table)
+
+    first, second = cerealizer.deserialize_batch([[''.join(['ab', 'c']), ''.join(['ab', 'cd'])] for _ in range(2)],
+                                                 List[str])
+    assert first[0] is second[0]
+    assert first[1] is not second[1]
+    assert table.values == {'abc': 'abc'}
+
+    table.clear()
+    other = cerealizer.deserialize([''.join(['x', 'y']) for _ in range(2)], List[str])
+    assert other[0] is other[1]
+    assert table.values == {'xy': 'xy'}
+    assert cerealizer.deserialize([''.join(['z', 'z']) for _ in range(2)], List[str]) == ['zz', 'zz']
+    assert table.values == {'xy': 'xy'}
+
+
+def test_per_batch():
+    @dataclasses.dataclass
+    class TestClass:
+        status: str
+        name: str
+
+    table = InternTable(per_batch=True)
+    cerealizer = JsonByteCerealizer(intern_table=table)
+
+    first, second = cerealizer.deserialize_batch([b'{"status": "active", "name": "first"}',
+                                                  b'{"status": "active", "name": "second"}'], TestClass)
+    assert first.status is second.status
+    assert table.values == {}
+    assert table.hits > 0
+
+    third, = cerealizer.deserialize_batch([b'{"status": "active", "name": "third"}'], TestClass)
+    assert third.status == first.status
+    assert third.status is not first.status
+
+
+def test_disabled():
+    @dataclasses.dataclass
+    class TestClass:
+        status: str
+
+    cerealizer = JsonByteCerealizer()
+    assert cerealizer.intern_table is None
+    first, second = cerealizer.deserialize_batch([b'{"status": "active"}'] * 2, TestClass)
+    assert first.status == second.status
+    assert first.status is not second.status
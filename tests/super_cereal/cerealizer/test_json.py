@@ -1,12 +1,18 @@
+import array
 import contextlib
+import gc
+import io
 import dataclasses
 import json
-from enum import Enum
-from typing import Optional, List, Dict
+from enum import Enum, EnumMeta
+from typing import Optional, List, Dict, Union
 
 import pytest
+from Crypto.Random import get_random_bytes
 
 from super_cereal.cerealizer import SerializationException, DeserializationException
+from super_cereal.cerealizer.builtins import PassthruCerealizer, DictCerealizer
+from super_cereal.cerealizer.encryption import Encrypted
 from super_cereal.cerealizer.json import JsonCerealizer, JsonByteCerealizer
 
 
@@ -291,3 +297,266 @@ def test_duck_typing():
 
     deserialized = cerealizer.deserialize(serialized, BrotherClass)
     assert deserialized == BrotherClass('Bryce')
+
+
+def test_field_plan_is_cached():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: int
+
+    cerealizer = JsonCerealizer()
+    dict_cerealizer = cerealizer.registry.default
+
+    serialized = cerealizer.serialize(TestClass('stuff', 42))
+    plan = dict_cerealizer.plans[TestClass]
+    assert [field for field, _, _ in plan.fields] == ['field1', 'field2']
+
+    assert cerealizer.deserialize(serialized, TestClass) == TestClass('stuff', 42)
+    assert dict_cerealizer.plans[TestClass] is plan
+
+    cerealizer.registry[bytes] = PassthruCerealizer()
+    assert TestClass not in dict_cerealizer.plans
+
+
+def test_field_plan_does_not_leak_classes():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+
+    cerealizer = JsonCerealizer()
+    cerealizer.serialize(TestClass('stuff'))
+    assert len(cerealizer.registry.default.plans) == 1
+
+    del TestClass
+    gc.collect()
+    assert len(cerealizer.registry.default.plans) == 0
+
+
+def test_ndjson_stream():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: Optional[List[int]]
+
+    cerealizer = JsonByteCerealizer()
+    objs = [TestClass(f'stuff\n{i}', [i] if i % 2 else None) for i in range(25)]
+
+    with io.BytesIO() as bytes_io:
+        assert cerealizer.dump_stream(objs, bytes_io, chunk_size=10) == 25
+        assert bytes_io.getvalue().count(b'\n') == 25
+        assert bytes_io.getvalue().splitlines()[1] == cerealizer.serialize(objs[1])
+
+        bytes_io.write(b'\n')
+        bytes_io.seek(0)
+        stream = cerealizer.load_stream(bytes_io, TestClass)
+        assert next(stream) == objs[0]
+        assert [objs[0]] + list(stream) == objs
+
+
+def test_ndjson_stream_encrypted():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: Encrypted[str]
+
+    cerealizer = JsonByteCerealizer({'the_key': get_random_bytes(16)})
+    objs = [TestClass(Encrypted('the_key', f'secret {i}')) for i in range(3)]
+
+    with io.BytesIO() as bytes_io:
+        cerealizer.dump_stream(objs, bytes_io)
+        bytes_io.seek(0)
+        assert list(cerealizer.load_stream(bytes_io, TestClass)) == objs
+
+
+def test_registry_resolution_cache():
+    class Color(Enum):
+        RED = 1
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: Optional[List[int]]
+        field3: Color
+
+    cerealizer = JsonCerealizer()
+    registry = cerealizer.registry
+    obj = TestClass('stuff', [1, 2], Color.RED)
+
+    assert cerealizer.serialize(obj) == {'field1': 'stuff', 'field2': [1, 2], 'field3': 'RED'}
+    misses = registry.cache_info().misses
+    assert registry.cache_info().size == misses
+
+    assert cerealizer.deserialize(cerealizer.serialize(obj), TestClass) == obj
+    assert registry.cache_info().misses == misses
+    info = registry.cache_info()
+    assert info.hits > 0
+    assert info.hit_ratio == info.hits / (info.hits + info.misses)
+
+    assert registry[Color] is registry[EnumMeta]
+    assert registry[TestClass] is registry.default
+
+    custom = PassthruCerealizer()
+    registry[TestClass] = custom
+    assert registry.cache_info().size == 0
+    assert registry[TestClass] is custom
+
+    del registry[TestClass]
+    assert registry[TestClass] is registry.default
+
+    registry.default = DictCerealizer()
+    assert registry[TestClass] is registry.default
+
+
+def test_top_level_enum():
+    class Color(Enum):
+        RED = 1
+
+    cerealizer = JsonCerealizer()
+    assert cerealizer.serialize(Color.RED) == 'RED'
+    assert cerealizer.deserialize('RED', Color) == Color.RED
+
+
+def test_union_dispatch():
+    class Color(Enum):
+        RED = 1
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: Union[int, str]
+        field2: Union[Color, List[int], None]
+        field3: Union[bool, int]
+
+    cerealizer = JsonCerealizer()
+
+    obj = TestClass(True, Color.RED, 1)
+    serialized = cerealizer.serialize(obj)
+    assert serialized == {'field1': 1, 'field2': 'RED', 'field3': 1}
+    assert type(serialized['field1']) == int
+    assert cerealizer.deserialize(serialized, TestClass) == TestClass(1, Color.RED, 1)
+
+    obj = TestClass('stuff', [1, 2], True)
+    serialized = cerealizer.serialize(obj)
+    assert serialized == {'field1': 'stuff', 'field2': [1, 2], 'field3': True}
+    assert cerealizer.deserialize(serialized, TestClass) == obj
+
+    union_cerealizer = cerealizer.registry[Union]
+    assert union_cerealizer.table(Union[int, str])[bool] == (int, cerealizer.registry[int])
+    assert union_cerealizer.table(Union[Color, List[int], None])[list][0] == List[int]
+
+    with pytest.raises(NotImplementedError):
+        cerealizer.serialize(TestClass(1.5, None, True))
+
+
+def test_optional_object():
+    @dataclasses.dataclass
+    class AnotherClass:
+        field: int
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: Optional[AnotherClass]
+        field2: Optional[AnotherClass]
+
+    cerealizer = JsonCerealizer()
+
+    obj = TestClass(AnotherClass(42), None)
+    serialized = cerealizer.serialize(obj)
+    assert serialized == {'field1': {'field': 42}, 'field2': None}
+    assert cerealizer.deserialize(serialized, TestClass) == obj
+
+
+def test_primitive_list_fast_path():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: List[float]
+        field2: List[int]
+        field3: List[str]
+
+    cerealizer = JsonCerealizer()
+    obj = TestClass([1.5, 2.5], [1, 2, 3], ['one', 'two'])
+
+    serialized = cerealizer.serialize(obj)
+    assert serialized == {'field1': [1.5, 2.5], 'field2': [1, 2, 3], 'field3': ['one', 'two']}
+    assert serialized['field1'] is not obj.field1
+
+    deserialized = cerealizer.deserialize(serialized, TestClass)
+    assert deserialized == obj
+    assert deserialized.field1 is serialized['field1']
+
+    # Mixed values are still converted one by one
+    # noinspection PyTypeChecker
+    deserialized = cerealizer.deserialize({'field1': [1, 2.5], 'field2': [True], 'field3': []}, TestClass)
+    assert deserialized == TestClass([1.0, 2.5], [1], [])
+    assert type(deserialized.field1[0]) == float
+    assert type(deserialized.field2[0]) == int
+
+
+def test_numeric_arrays():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: List[float]
+        field2: List[int]
+        field3: List[int]
+        field4: List[str]
+
+    cerealizer = JsonCerealizer(numeric_arrays=True)
+    # noinspection PyTypeChecker
+    obj = TestClass(array.array('d', [1.5, 2.5]), [1, 2, 3], [1 << 70], ['one'])
+
+    serialized = cerealizer.serialize(obj)
+    assert serialized == {'field1': [1.5, 2.5], 'field2': [1, 2, 3], 'field3': [1 << 70], 'field4': ['one']}
+
+    deserialized = cerealizer.deserialize(serialized, TestClass)
+    assert deserialized.field1 == array.array('d', [1.5, 2.5])
+    assert deserialized.field2 == array.array('q', [1, 2, 3])
+    assert deserialized.field3 == [1 << 70]
+    assert deserialized.field4 == ['one']
+
+
+def test_numeric_arrays_in_union():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: Optional[List[float]]
+        field2: Union[str, List[int]]
+
+    cerealizer = JsonByteCerealizer(numeric_arrays=True)
+    deserialized = cerealizer.deserialize(b'{"field1": [1.5], "field2": [1, 2]}', TestClass)
+    assert deserialized.field1 == array.array('d', [1.5])
+    assert deserialized.field2 == array.array('q', [1, 2])
+
+    assert cerealizer.deserialize(cerealizer.serialize(deserialized), TestClass) == deserialized
+
+    @dataclasses.dataclass
+    class Address:
+        street: str
+        city: str
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: Optional[Address]
+        field3: List[Address]
+        field4: Encrypted[str]
+
+    cerealizer = JsonByteCerealizer({'the_key': get_random_bytes(16)})
+    obj = TestClass('stuff', Address('Main', 'Chicago'), [Address('First', 'Denver')], Encrypted('the_key', 'secret'))
+    serialized = cerealizer.serialize(obj)
+
+    # The secret can't be decrypted, so it must not be touched.
+    cerealizer.registry[Encrypted].encryption_keys = {'the_key': get_random_bytes(16)}
+    projected = cerealizer.deserialize(serialized, TestClass, fields=['field1', 'field2.city', 'field3.street'])
+
+    assert isinstance(projected, TestClass)
+    assert projected.field1 == 'stuff'
+    assert projected.field2.city == 'Chicago'
+    assert [address.street for address in projected.field3] == ['First']
+    for attribute in (lambda: projected.field4, lambda: projected.field2.street, lambda: projected.field3[0].city):
+        with pytest.raises(AttributeError):
+            attribute()
+
+    assert cerealizer.deserialize(serialized, TestClass, fields=['field2', 'field2.city']).field2 == obj.field2
+
+    with pytest.raises(DeserializationException, match='has no field bogus'):
+        cerealizer.deserialize(serialized, TestClass, fields=['bogus'])
+    with pytest.raises(DeserializationException):
+        cerealizer.deserialize(serialized, TestClass, fields=['field4.value'])
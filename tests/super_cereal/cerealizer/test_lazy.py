@@ -0,0 +1,141 @@
+import copy
+import dataclasses
+import pickle
+from enum import Enum
+from typing import Optional, List, Dict, Union
+
+import pytest
+
+from super_cereal.cerealizer.json import JsonCerealizer
+from super_cereal.cerealizer.lazy import LazyDictCerealizer
+
+
+def test_lazy():
+    class Color(Enum):
+        RED = 1
+        GREEN = 2
+
+    @dataclasses.dataclass
+    class AnotherClass:
+        field: int
+        color: Color
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: List[AnotherClass]
+        field3: Optional[AnotherClass]
+        field4: Dict[str, float]
+        field5: AnotherClass
+
+    obj = TestClass(
+        'stuff',
+        [AnotherClass(42, Color.RED), AnotherClass(27, Color.GREEN)],
+        None,
+        {'value': 222.55},
+        AnotherClass(1, Color.GREEN)
+    )
+
+    cerealizer = JsonCerealizer(lazy=True)
+    assert isinstance(cerealizer.registry.default, LazyDictCerealizer)
+
+    serialized = cerealizer.serialize(obj)
+    assert serialized == JsonCerealizer().serialize(obj)
+
+    deserialized = cerealizer.deserialize(serialized, TestClass)
+    assert isinstance(deserialized, TestClass)
+    assert vars(deserialized).keys() >= {'field1', 'field4'}
+    assert 'field2' not in vars(deserialized)
+
+    assert deserialized.field5 == AnotherClass(1, Color.GREEN)
+    assert deserialized.field5 is deserialized.field5
+    assert 'field2' not in vars(deserialized)
+
+    assert deserialized == obj
+    assert obj == deserialized
+    assert repr(deserialized) == repr(obj)
+
+
+def test_serialize_untouched():
+    @dataclasses.dataclass
+    class AnotherClass:
+        field: int
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: Union[int, str]
+        field2: List[AnotherClass]
+
+    cerealizer = JsonCerealizer(lazy=True)
+    serialized = {'field1': True, 'field2': [{'field': 1, 'unknown': 1}]}
+
+    # Like DictCerealizer, every field is converted and serialized again.
+    deserialized = cerealizer.deserialize(serialized, TestClass)
+    reserialized = cerealizer.serialize(deserialized)
+    assert reserialized == {'field1': 1, 'field2': [{'field': 1}]}
+    assert reserialized == JsonCerealizer().serialize(JsonCerealizer().deserialize(serialized, TestClass))
+
+    cerealizer.registry.default = LazyDictCerealizer(passthrough=True)
+    deserialized = cerealizer.deserialize(serialized, TestClass)
+    deserialized.field2.append(AnotherClass(2))
+    reserialized = cerealizer.serialize(deserialized)
+    assert reserialized['field1'] is True
+    assert reserialized['field2'] == [{'field': 1}, {'field': 2}]
+
+
+# Module level, so they can be pickled.
+@dataclasses.dataclass
+class PicklableClass:
+    field: int
+
+
+@dataclasses.dataclass
+class PicklableMessage:
+    field1: str
+    field2: List[PicklableClass]
+
+
+def test_copy_and_pickle():
+    obj = PicklableMessage('stuff', [PicklableClass(42)])
+    cerealizer = JsonCerealizer(lazy=True)
+    deserialized = cerealizer.deserialize(cerealizer.serialize(obj), PicklableMessage)
+
+    for duplicate in (copy.copy(deserialized), pickle.loads(pickle.dumps(deserialized))):
+        assert type(duplicate) is PicklableMessage
+        assert duplicate == obj
+
+
+def test_missing_field():
+    @dataclasses.dataclass
+    class AnotherClass:
+        field: int
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: List[AnotherClass]
+
+    cerealizer = JsonCerealizer(lazy=True)
+    deserialized = cerealizer.deserialize({'field1': 'stuff'}, TestClass)
+
+    with pytest.raises(KeyError):
+        _ = deserialized.field2
+
+
+def test_post_init_is_eager():
+    @dataclasses.dataclass
+    class AnotherClass:
+        field: int
+
+    @dataclasses.dataclass
+    class WithPostInit:
+        field: AnotherClass
+
+        def __post_init__(self):
+            self.doubled = self.field.field * 2
+
+    cerealizer = JsonCerealizer(lazy=True)
+    deserialized = cerealizer.deserialize({'field': {'field': 21}}, WithPostInit)
+
+    assert type(deserialized) is WithPostInit
+    assert deserialized.doubled == 42
@@ -0,0 +1,50 @@
+import dataclasses
+from typing import List
+
+from Crypto.Random import get_random_bytes
+
+from super_cereal.cerealizer.avro import AvroCerealizer
+from super_cereal.cerealizer.encryption import Encrypted
+from super_cereal.cerealizer.json import JsonByteCerealizer
+from super_cereal.cerealizer.parallel import ParallelCerealizer
+
+
+# Module level, so they can be pickled.
+@dataclasses.dataclass
+class AnotherClass:
+    field: int
+
+
+@dataclasses.dataclass
+class Message:
+    field1: str
+    field2: List[AnotherClass]
+    field3: Encrypted[str]
+
+
+def make_objs(count: int) -> List[Message]:
+    return [Message(f'message {i}', [AnotherClass(i)], Encrypted('the_key', f'secret {i}')) for i in range(count)]
+
+
+def test_json():
+    keys = {'the_key': get_random_bytes(16)}
+    objs = make_objs(25)
+
+    with ParallelCerealizer(JsonByteCerealizer, keys, max_workers=2, chunksize=4) as cerealizer:
+        serialized = cerealizer.serialize_many(objs, Message)
+        assert len(serialized) == 25
+        assert [JsonByteCerealizer(keys).deserialize(obj, Message) for obj in serialized] == objs
+        assert cerealizer.deserialize_many(serialized, Message) == objs
+        assert cerealizer.serialize_many([], Message) == []
+
+    with ParallelCerealizer(JsonByteCerealizer, keys, lazy_decryption=True, max_workers=2, chunksize=4) as cerealizer:
+        assert cerealizer.deserialize_many(serialized, Message) == objs
+
+
+def test_avro():
+    keys = {'the_key': get_random_bytes(16)}
+    objs = make_objs(10)
+
+    with ParallelCerealizer(AvroCerealizer, keys, single_object=True, max_workers=2, chunksize=3) as cerealizer:
+        serialized = cerealizer.serialize_many(iter(objs), Message)
+        assert cerealizer.deserialize_many(serialized, Message) == objs
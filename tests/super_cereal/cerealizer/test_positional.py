@@ -0,0 +1,131 @@
+import dataclasses
+from enum import Enum
+from typing import Optional, List, Dict
+
+import pytest
+
+from super_cereal.cerealizer import DeserializationException, SerializationException
+from super_cereal.cerealizer.json import JsonCerealizer, JsonByteCerealizer
+from super_cereal.cerealizer.positional import PositionalDictCerealizer
+
+
+def test_positional():
+    class Color(Enum):
+        RED = 1
+        GREEN = 2
+
+    @dataclasses.dataclass
+    class AnotherClass:
+        field: int
+        color: Color
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: List[AnotherClass]
+        field3: Optional[AnotherClass]
+        field4: Dict[str, float]
+
+    obj = TestClass('stuff', [AnotherClass(42, Color.RED), AnotherClass(27, Color.GREEN)], None, {'value': 1.5})
+
+    cerealizer = JsonByteCerealizer(positional=True)
+    assert isinstance(cerealizer.registry.default, PositionalDictCerealizer)
+
+    serialized = cerealizer.serialize(obj)
+    assert serialized == b'["stuff", [[42, "RED"], [27, "GREEN"]], null, {"value": 1.5}]'
+    assert len(serialized) < len(JsonByteCerealizer().serialize(obj))
+    assert cerealizer.deserialize(serialized, TestClass) == obj
+
+    # The keyed form can still be read.
+    assert cerealizer.deserialize(JsonByteCerealizer().serialize(obj), TestClass) == obj
+
+
+def test_per_type_with_version():
+    @dataclasses.dataclass
+    class AnotherClass:
+        field: int
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: List[AnotherClass]
+
+    obj = TestClass('stuff', [AnotherClass(42), AnotherClass(27)])
+
+    cerealizer = JsonCerealizer()
+    cerealizer.registry[AnotherClass] = PositionalDictCerealizer(version=2)
+
+    serialized = cerealizer.serialize(obj)
+    assert serialized['field2'] == [[2, 42], [2, 27]]
+    assert cerealizer.deserialize(serialized, TestClass) == obj
+
+    cerealizer.registry[AnotherClass] = PositionalDictCerealizer(version=3)
+    with pytest.raises(DeserializationException, match='is version 3, but version 2 was read'):
+        cerealizer.deserialize(serialized, TestClass)
+
+
+def test_wrong_length():
+    @dataclasses.dataclass
+    class TestClass:
+        field1: int
+        field2: str
+
+    cerealizer = JsonCerealizer(positional=True)
+
+    with pytest.raises(DeserializationException, match='has 2 fields, but 3 were read'):
+        cerealizer.deserialize([1, 'stuff', 'extra'], TestClass)
+
+
+def test_no_annotations():
+    class NoAnnotations:
+        def __init__(self, bogus):
+            pass
+
+    cerealizer = JsonCerealizer(positional=True)
+
+    with pytest.raises(SerializationException):
+        cerealizer.serialize(NoAnnotations('something'))
+    with pytest.raises(DeserializationException):
+        cerealizer.deserialize(['something'], NoAnnotations)
+
+
+def test_projection():
+    @dataclasses.dataclass
+    class Address:
+        street: str
+        city: str
+
+    @dataclasses.dataclass
+    class TestClass:
+        field1: str
+        field2: Optional[Address]
+        field3: List[Address]
+
+    obj = TestClass('stuff', Address('Main', 'Chicago'), [Address('First', 'Denver')])
+
+    cerealizer = JsonCerealizer()
+    cerealizer.registry[TestClass] = PositionalDictCerealizer(version=2)
+    cerealizer.registry[Address] = PositionalDictCerealizer()
+    serialized = cerealizer.serialize(obj)
+
+    deserialized = cerealizer.deserialize(serialized, TestClass, fields=['field1', 'field2.city', 'field3.street'])
+    assert deserialized.field1 == 'stuff'
+    assert deserialized.field2.city == 'Chicago'
+    assert deserialized.field3[0].street == 'First'
+    assert not hasattr(deserialized.field2, 'street')
+
+    # The dict form can still be read.
+    assert cerealizer.deserialize(JsonCerealizer().serialize(obj), TestClass, fields=['field2.city']).field2.city == \
+        'Chicago'
+
+    cerealizer.registry[TestClass] = PositionalDictCerealizer(version=3)
+    with pytest.raises(DeserializationException, match='is version 3, but version 2 was read'):
+        cerealizer.deserialize(serialized, TestClass, fields=['field1'])
+
+
+def test_conflicting_modes():
+    with pytest.raises(ValueError, match='Only one of lazy, positional can be set.'):
+        JsonCerealizer(lazy=True, positional=True)
+
+    with pytest.raises(ValueError, match='Only one of compiled, lazy, positional can be set.'):
+        JsonByteCerealizer(compiled=True, lazy=True, positional=True)